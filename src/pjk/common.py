@@ -4,6 +4,7 @@
 import contextlib, io, os, subprocess, sys
 import os
 import re
+import ast
 from abc import ABC
 from enum import Enum
 from pjk.sources.format_source import FormatSource
@@ -32,6 +33,46 @@ class ReducingNamespace:
             return value
         return [value]  # promote scalars to singleton lists
 
+def safe_attr(obj, name: str):
+    """obj.name the way SafeNamespace resolves it: dict keys, missing key -> None."""
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name)
+
+def get_path(record: dict, parts: tuple):
+    """Value at a split dot path (e.g. ('address', 'zip')) in the raw record, or None."""
+    value = record
+    for part in parts:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+        if value is None:
+            return None
+    return value
+
+class _FieldAccessRewriter(ast.NodeTransformer):
+    # every obj.name read becomes _attr(obj, 'name'), so f.a.b walks the raw
+    # record dict and str/list methods (f.color.startswith) still work
+    def visit_Attribute(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load):
+            return node
+        call = ast.Call(func=ast.Name(id='_attr', ctx=ast.Load()),
+                        args=[node.value, ast.Constant(node.attr)], keywords=[])
+        return ast.copy_location(call, node)
+
+def compile_record_expr(expr: str, filename: str):
+    """
+    Compile an f.<field> expression to run against the raw record dict,
+    eval with record_globals() and locals {'f': record}.
+    """
+    tree = ast.parse(expr, mode='eval')
+    tree = ast.fix_missing_locations(_FieldAccessRewriter().visit(tree))
+    return compile(tree, filename, 'eval')
+
+def record_globals(**extra) -> dict:
+    return {'_attr': safe_attr, **extra}
+
 # pjk/common.py
 import contextlib, io, os, subprocess, sys
 
@@ -1,12 +1,18 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2024 Mike Schultz
 
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Optional, List
+from typing import Any, Iterator, Optional, List
 from pjk.usage import Usage, NoBindUsage, ParsedToken
+
+BATCH_SIZE = 1000 # records per list on the iter_batches() path
     
 # mixin
 class KeyedSource(ABC):
+    listable = True # can get_unlookedup_records() for outer join, a remote table can't
+    track_matched = False # set by join:outer before its lookups, so others skip recording matches
+
     @classmethod
     def usage(cls):
         return Usage(
@@ -19,6 +25,11 @@ class KeyedSource(ABC):
         """Return the record associated with the given key, or None."""
         pass
 
+    def lookups(self, records):
+        """(record, lookup(record)) per record, remote sources override to look up a batch at a time."""
+        for record in records:
+            yield record, self.lookup(record)
+
     def get_unlookedup_records(self) -> List[Any]:
         # for outer join
         pass
@@ -48,11 +59,54 @@ class Source(ABC):
             self._iter = iter(self)
         return next(self._iter)
 
+    def iter_batches(self) -> Iterator[List[dict]]:
+        """
+        Yield lists of records.  Default adapter chunks the per-record __iter__,
+        components override it to move whole lists at a time.
+        """
+        batch = []
+        for record in self:
+            batch.append(record)
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     def deep_copy(self):
         return None  # Default: not copyable unless overridden
+
+    def proc_splittable(self) -> bool:
+        """
+        Whether --procs may run this component's clones in separate processes.
+        Clones that share state through their root only see each other in threads,
+        so those components say no and the expression falls back to threads.
+        """
+        return True
     
     def close(self):
         pass
+
+    def push_limit(self, limit: int):
+        """
+        No more than limit records will be read from this source (a head follows it).
+        Sources that can stop early or ask for less remember it, others ignore it.
+        """
+        pass
+
+    def read_tail(self, limit: int) -> Optional[List[dict]]:
+        """
+        The last limit records, found without reading the rest of the input
+        (a tail follows this source), or None if this source can't.
+        """
+        return None
+
+    def cancel(self):
+        """
+        Stop starting new work, e.g. reserving more files, because downstream
+        (a head) needs no more records.  May be called from another clone's thread.
+        """
+        pass
     
     def _get_sources(self, source_list: list):
         pass
@@ -103,6 +157,86 @@ class DeepCopyPipe(Pipe):
         pipe.add_source(source_clone)
         return pipe
 
+class ClonePartials:
+    """
+    Partial results of a pipe and its deep_copy clones, shared through the root.
+    Every instance joins when it is created, and submits its partial once its
+    input is exhausted.  The last instance to submit gets all the partials back
+    to merge and emit; the others get None and emit nothing.  Not shared across
+    --procs worker processes, so a pipe using one isn't proc_splittable().
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.joined = 0
+        self.parts = []
+
+    def join(self):
+        with self.lock:
+            self.joined += 1
+
+    def submit(self, part) -> Optional[list]:
+        with self.lock:
+            self.parts.append(part)
+            if len(self.parts) < self.joined:
+                return None
+            parts, self.parts = self.parts, [] # ready for reset() and another round
+            return parts
+
+def get_partials(pipe: Pipe) -> ClonePartials:
+    """The ClonePartials pipe shares with its root, joined on pipe's behalf."""
+    owner = pipe.root if pipe.root is not None else pipe
+    if not hasattr(owner, 'partials'):
+        owner.partials = ClonePartials()
+    owner.partials.join()
+    return owner.partials
+
+class BroadcastPipe(Pipe):
+    """
+    Two-input pipe whose right input, a KeyedSource, is built once and shared
+    read-only by the deep_copy clones of the left input, so its lookup() must be
+    thread-safe.  The shared right side is closed by the last instance to close
+    rather than by each clone's sink.
+    """
+    arity = 2
+
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
+        self.broadcast = root.broadcast if root is not None else ClonePartials()
+        self.broadcast.join()
+
+    def broadcasts(self) -> bool:
+        """Whether the right input is a shared KeyedSource, subclasses may say no."""
+        return True
+
+    def proc_splittable(self) -> bool:
+        return False # the right side is built once and shared by the clones
+
+    def deep_copy(self):
+        if not self.broadcasts():
+            return None
+        source_clone = self.left.deep_copy()
+        if not source_clone:
+            return None
+
+        pipe = type(self)(self.ptok, self.usage, self) # this self is the root
+        pipe.add_source(source_clone)
+        pipe.right = self.right # shared, not one of the clone's inputs
+        return pipe
+
+    def _get_sources(self, source_list: list):
+        if not self.broadcasts():
+            super()._get_sources(source_list)
+            return
+        source_list.append(self.left)
+        self.left._get_sources(source_list)
+
+    def close(self):
+        if self.broadcasts() and self.broadcast.submit(None) is not None:
+            right = [self.right]
+            self.right._get_sources(right)
+            for source in right:
+                source.close()
+
 class Sink(ABC):
     @classmethod
     def usage(cls):
@@ -0,0 +1,55 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+#
+# djk/integrations/opensearch_lookup.py
+
+from typing import Any, Dict, List
+
+from pjk.usage import ParsedToken, Usage, TokenError
+from pjk.common import Integration
+from pjk.sources.lookup_source import LookupSource, def_lookup_params
+from pjk.integrations.opensearch_client import OpenSearchClient, OS_CONFIG_TUPLES
+
+class OpenSearchLookup(LookupSource, Integration):
+    @classmethod
+    def usage(cls):
+        u = Usage(
+            name='os_lookup',
+            desc="Keyed Source over an Opensearch index for join or filter, one request per batch of left keys,\n" +
+            "with results cached. @key=_id fetches documents by id with mget, any other key field uses a terms\n" +
+            "query on it (a keyword field, '<field>.keyword' matches on <field>). Takes one hit of duplicate keys.\n" +
+            "Configured like os_query, e.g. an entry 'OpenSearchLookup-<instance>: {_alias: OpenSearchQueryPipe-<instance>}'.",
+            component_class=cls
+        )
+        def_lookup_params(u)
+        u.def_param(name='index', usage='index to look up in, default is the instance default_index')
+        u.def_example(expr_tokens=["events.json", "os_lookup:myinst@index=users@key=_id", "join:left", "-"], expect=None)
+        u.def_example(expr_tokens=["events.json", "os_lookup:myinst@index=users@key=email.keyword", "filter:+", "-"], expect=None)
+        u.def_config_tuples(OS_CONFIG_TUPLES)
+        return u
+
+    def __init__(self, ptok: ParsedToken, usage: Usage):
+        super().__init__(ptok, usage)
+        self.index = usage.get_param('index') or usage.get_config('default_index')
+        if not self.index:
+            raise TokenError("os_lookup needs @index=<index> or a default_index for the instance")
+        self.terms_field = self.field
+        self.field = self.field.removesuffix('.keyword') # as in the left records and _source
+        self.client = OpenSearchClient.get_client(usage)
+
+    def fetch(self, keys: List[Any]) -> Dict[Any, dict]:
+        if self.field == '_id':
+            res = self.client.mget(index=self.index, body={'ids': [str(key) for key in keys]})
+            by_id = {str(key): key for key in keys}
+            return {by_id[doc['_id']]: doc['_source'] for doc in res.get('docs', []) if doc.get('found')}
+
+        body = {'query': {'terms': {self.terms_field: keys}}, 'size': len(keys)}
+        found = {}
+        while True:
+            hits = self.client.search(index=self.index, body=body).get('hits', {}).get('hits', [])
+            for hit in hits:
+                source = hit.get('_source', {})
+                found[source.get(self.field)] = source
+            if len(hits) < body['size']:
+                return found
+            body['from'] = body.get('from', 0) + len(hits) # duplicate keys filled the page
@@ -91,7 +91,7 @@ class OpenSearchQueryPipe(QueryPipe, Integration):
         try:
             # Build final request body
             req_body = deepcopy(query_body)
-            req_body["size"] = self.count
+            req_body["size"] = self.count if self.row_limit is None else min(self.count, self.row_limit)
 
             res = self.client.search(index=self.index, body=req_body)
 
@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+#
+# djk/integrations/postgres_lookup.py
+
+import re
+from typing import Any, Dict, List
+
+from pjk.usage import ParsedToken, Usage, TokenError
+from pjk.common import Integration
+from pjk.sources.lookup_source import LookupSource, def_lookup_params
+from pjk.integrations.postgres_pipe import DBClient, PostgresPipe, normalize
+
+COLUMN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+TABLE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$') # may be schema.table
+
+class PostgresLookup(LookupSource, Integration):
+    @classmethod
+    def usage(cls):
+        u = Usage(
+            name='pg_lookup',
+            desc="Keyed Source over a Postgres table for join or filter, one 'WHERE <key> = ANY(...)' query\n" +
+            "per batch of left keys, with results cached. Takes one row of duplicate keys.\n" +
+            "Configured like postgres, e.g. an entry 'PostgresLookup-<instance>: {_alias: PostgresPipe-<instance>}'.",
+            component_class=cls
+        )
+        def_lookup_params(u)
+        u.def_param(name='table', usage='table (or schema.table) to look up in')
+        u.def_example(expr_tokens=["orders.json", "pg_lookup:mydb@table=customers@key=customer_id", "join:left", "-"], expect=None)
+        u.def_config_tuples(PostgresPipe.config_tuples)
+        return u
+
+    def __init__(self, ptok: ParsedToken, usage: Usage):
+        super().__init__(ptok, usage)
+        self.table = usage.get_param('table')
+        if not self.table or not TABLE.match(self.table):
+            raise TokenError(f"pg_lookup needs a plain @table or @table=schema.table, got '{self.table}'")
+        if not COLUMN.match(self.field):
+            raise TokenError(f"pg_lookup needs a plain column for @key, got '{self.field}'")
+        self.query = f"SELECT * FROM {self.table} WHERE {self.field} = ANY(%s)"
+
+        self.client = DBClient(
+            host=usage.get_config("host"),
+            username=usage.get_config("user"),
+            password=usage.get_config("password"),
+            db_name=usage.get_config("db_name"),
+            port=usage.get_config("port"),
+            ssl=usage.get_config("ssl"),
+        )
+
+    def fetch(self, keys: List[Any]) -> Dict[Any, dict]:
+        cur = self.client.conn.cursor()
+        try:
+            cur.execute(self.query, (keys,))
+            cols = [d[0] for d in cur.description]
+            key_ix = [col.lower() for col in cols].index(self.field.lower()) # unquoted, folded to lowercase
+            found = {}
+            while True:
+                rows = cur.fetchmany(len(keys))
+                if not rows:
+                    return found
+                for row in rows:
+                    # keyed by the raw value, normalize() may turn it into a string
+                    found[row[key_ix]] = {col: normalize(val) for col, val in zip(cols, row)}
+        finally:
+            cur.close()
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
@@ -260,7 +260,7 @@ class PostgresPipe(QueryPipe, Integration):
             if not did_executemany and cur.description:
                 cols = [d[0] for d in cur.description]
                 if not (len(cols) == 1 and cols[0] == "ingest_event"):
-                    for row in cur:
+                    for row in self.fetch_rows(cur):
                         yield _row_to_dict(cur, row)
 
         finally:
@@ -225,7 +225,7 @@ class SnowflakePipe(QueryPipe, Integration):
 
                     # Stream result rows for queries that return a result set
                     if cur.description:
-                        for row in cur:
+                        for row in self.fetch_rows(cur):
                             yield _row_to_dict(cur, row)
                 finally:
                     cur.close()
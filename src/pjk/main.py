@@ -11,6 +11,8 @@ from pjk.usage import UsageError
 from pjk.log import init as init_logging
 import traceback
 import concurrent.futures
+import multiprocessing
+import threading
 from pjk.registry import ComponentRegistry
 from pjk.sinks.stdout import StdoutSink
 from pjk.man_page import do_man, do_examples, display_configs, display_macros
@@ -18,6 +20,7 @@ from pjk.history import write_history, display_history, get_history_tokens, prin
 from pjk.sinks.expect import ExpectSink
 from pjk.progress import ProgressDisplay
 from pjk.version import __version__
+import pjk.work_units as work_units
 
 def execute_threaded(sinks, stop_progress=None):
     max_workers = min(32, len(sinks))
@@ -50,6 +53,99 @@ def execute_threaded(sinks, stop_progress=None):
     else:
         executor.shutdown(wait=True)
 
+def proc_worker(tokens: List[str], queues: list, worker_no: int):
+    """Entry point of a --procs worker: re-parse and draw file units from the parent."""
+    work_units.units = work_units.WorkUnits(queues=queues, worker_no=worker_no)
+    initialize()
+    parser = ExpressionParser(ComponentRegistry())
+    sink = parser.parse(tokens)
+    sink.drain()
+
+def feed_units(shared: list, queues: list, num_procs: int):
+    for taken, queue in zip(shared, queues):
+        for unit in taken.drain():
+            queue.put(unit)
+        for _ in range(num_procs):
+            queue.put(None) # one end-of-units sentinel per worker
+
+def close_chain(sink) -> list:
+    """Close sink and every source feeding it, returns the sources."""
+    sink.close()
+    inputs = [sink.input]
+    sink.input._get_sources(inputs)
+    for input in inputs:
+        input.close()
+    return inputs
+
+def execute_procs(tokens: List[str], registry: ComponentRegistry, num_procs: int) -> bool:
+    """
+    Run the expression in num_procs worker processes.  Returns False (nothing run)
+    when the expression can't be split by file, i.e. it would not fan out to threads,
+    none of its sources draws from a shared file iterator, or a component isn't
+    proc_splittable() because its clones share in-memory state.  So only stateless
+    pipelines gain from processes: sort, agg, mapby, groupby, top-level reduce,
+    head, top, sample (count), distinct, join and filter run in threads instead.
+    """
+    work_units.units = work_units.WorkUnits()
+    try:
+        sink = ExpressionParser(registry).parse(tokens)
+        clone = sink.deep_copy() # same test as threaded fan-out
+        shared = work_units.units.shared
+    finally:
+        work_units.units = None
+
+    # this parse only found the units, close what it and the clone opened,
+    # the clone too or a right side shared with it stays open
+    inputs = close_chain(sink)
+    if clone is not None:
+        close_chain(clone)
+
+    if clone is None or not shared:
+        return False
+    if not all(input.proc_splittable() for input in inputs):
+        return False
+
+    ctx = multiprocessing.get_context()
+    queues = [ctx.Queue(maxsize=2 * num_procs) for _ in shared]
+    procs = [ctx.Process(target=proc_worker, args=(tokens, queues, i), name=f'pjk-proc-{i}')
+             for i in range(num_procs)]
+    for p in procs:
+        p.start()
+
+    feeder = threading.Thread(target=feed_units, args=(shared, queues, num_procs), name='UnitFeeder', daemon=True)
+    feeder.start()
+
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        os._exit(130)
+    finally:
+        for q in queues:
+            q.cancel_join_thread()
+
+    failed = [p.name for p in procs if p.exitcode != 0]
+    if failed:
+        raise Exception(f"worker process failed: {', '.join(failed)}")
+    return True
+
+def split_num_procs(tokens: List[str]):
+    """Splits --procs=N off the expression tokens, N is 1 when absent."""
+    num_procs = 1
+    expr_tokens = []
+    for token in tokens:
+        if not token.startswith('--procs'):
+            expr_tokens.append(token)
+            continue
+        _, _, value = token.partition('=')
+        if not value.isdigit() or int(value) < 1:
+            print('--procs=N requires a positive integer', file=sys.stderr)
+            sys.exit(2)
+        num_procs = int(value)
+    return expr_tokens, num_procs
+
 def initialize():
     init_logging()
 
@@ -113,10 +209,15 @@ def execute_tokens(tokens: List[str]):
         cmd = printable_command(tokens)
         print(f"pjk {cmd}")
 
+    tokens, num_procs = split_num_procs(tokens)
     parser = ExpressionParser(registry)
 
     display = None
     try:
+        if num_procs > 1 and execute_procs(tokens, registry, num_procs):
+            write_history(sys.argv[1:])
+            return
+
         sink = parser.parse(tokens)
         write_history(sys.argv[1:]) # now that it's parsed sucessfully
         if not isinstance(sink, (StdoutSink | ExpectSink)):
@@ -4,17 +4,18 @@
 import os
 import shlex
 from typing import Any, List
-from pjk.components import Source, Pipe, Sink
+from pjk.components import Source, Pipe, Sink, KeyedSource, get_partials
 from pjk.usage import TokenError, UsageError, ParsedToken, Usage
 from pjk.pipes.let_reduce import ReducePipe
 from pjk.pipes.progress_pipe import ProgressPipe
+from pjk.pipes.fuse import fuse_pipes
 from pjk.registry import ComponentRegistry
 from pjk.progress import papi
 from typing import Dict
 from pathlib import Path
 from pjk.progress import ProgressIgnore
 from pjk.parse_pjk_file import handle_pjk_file
-from pjk.common import SafeNamespace
+from pjk.common import compile_record_expr, record_globals
 
 MACROS_FILE = '~/.pjk/macros.txt'
 MACRO_PREFIX = 'm'
@@ -151,15 +152,16 @@ class ExpressionParser:
 
             for pos, token in enumerate(self.tokens):
                 if pos == len(self.tokens) - 1: # token should be THE sink
-                    return self.get_sink(stack_helper, token)
+                    return fuse_pipes(self.get_sink(stack_helper, token))
                     
                 source = self.registry.create_source(token)
                 if source:
                     if pos == 0 and source_override is not None:
                         source = source_override
                     stack_helper.add_operator(source, self.stack)
-                    progress_pipe = ProgressPipe(component=source, simple=True)
-                    stack_helper.add_operator(progress_pipe, self.stack)
+                    if not isinstance(source, KeyedSource): # join/filter need the keyed source itself
+                        progress_pipe = ProgressPipe(component=source, simple=True)
+                        stack_helper.add_operator(progress_pipe, self.stack)
                     continue
                 
                 subexp = SubExpression.create(token)
@@ -193,11 +195,15 @@ class ExpressionParser:
             raise UsageError(usage_error_message, self.tokens, pos, e)
     
 class ReducerAggregatorPipe(Pipe):
-    def __init__(self, top_level_reducers: List[Any]):
-        super().__init__(None, None)
+    def __init__(self, top_level_reducers: List[Any], root = None):
+        super().__init__(None, None, root)
         self.top_level_reducers = top_level_reducers
         self.reduction = {}
         self.done = False
+        self.partials = get_partials(self)
+
+    def proc_splittable(self) -> bool:
+        return False # clones' accumulators are merged through partials
 
     def reset(self):
         self.done = False
@@ -205,14 +211,39 @@ class ReducerAggregatorPipe(Pipe):
 
     def __iter__(self):
         if not self.done:
-            for _ in self.left:
+            for _ in self.left.iter_batches():
                 pass  # consume all input
-            for reducer in self.top_level_reducers:
+            self.done = True
+
+            # the last clone to finish combines everyone's accumulators
+            parts = self.partials.submit([reducer.accum_value for reducer in self.top_level_reducers])
+            if parts is None:
+                return
+
+            for i, reducer in enumerate(self.top_level_reducers):
+                reducer.merge_partials([part[i] for part in parts])
                 name, value = reducer.get_subexp_result()
                 self.reduction[name] = value
-            self.done = True
             yield self.reduction
 
+    def deep_copy(self):
+        if not all(reducer.mergeable for reducer in self.top_level_reducers):
+            return None
+
+        source_clone = self.left.deep_copy()
+        if not source_clone:
+            return None
+
+        # the clone's reducers are the ones whose root is one of ours
+        sources = [source_clone]
+        source_clone._get_sources(sources)
+        clones = {id(op.root): op for op in sources if isinstance(op, ReducePipe)}
+        reducers = [clones[id(reducer)] for reducer in self.top_level_reducers]
+
+        pipe = ReducerAggregatorPipe(top_level_reducers=reducers, root=self)
+        pipe.add_source(source_clone)
+        return pipe
+
 class StackLoader:
     def __init__(self):
         self.top_level_reducers = []
@@ -360,7 +391,8 @@ class SubExpressionIf(Pipe):
         self.inrecs = papi.get_counter(self, var_label='recs_in', display=False)
         self.recs_true = papi.get_percentage_counter(self, var_label='recs_true', denom_counter=self.inrecs)
         try:
-            self.code = compile(expr, '<if>', 'eval')
+            self.code = compile_record_expr(expr, '<if>')
+            self.env = record_globals()
         except Exception as e:
             raise UsageError(f"Invalid if expression: {expr}") from e
 
@@ -374,9 +406,8 @@ class SubExpressionIf(Pipe):
         for record in self.left:
             self.inrecs.increment()
             self.upstream_source.set_list([record])
-            f = SafeNamespace(record)
             try:
-                cond_true = eval(self.code, {}, {'f': f})
+                cond_true = eval(self.code, self.env, {'f': record})
             except Exception:
                 cond_true = False
             if cond_true:
@@ -0,0 +1,117 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# djk/pipes/agg.py
+
+import re
+from pjk.components import DeepCopyPipe, get_partials
+from pjk.usage import ParsedToken, Usage, NoBindUsage, TokenError
+from pjk.progress import papi
+from pjk.pipes.let_reduce import (NAMED_AGG_PARAMS, is_named_agg, percentile_of, new_named_acc,
+                                  named_agg_value, eval_named_aggregation, merge_named_agg,
+                                  finalize_named_agg)
+
+class AggPipe(DeepCopyPipe):
+    @classmethod
+    def usage(cls):
+        usage = NoBindUsage( # agg list isn't name=value params
+            name='agg',
+            desc="Hash aggregate: per-key named aggregations, keeping only accumulators (not records) per key.\n" +
+            "<agg>=<field> outputs <agg>_<field>, agg is one of ave, sum, min, max, distinct, pNN.\n" +
+            "Every key gets a count. Records without all key fields are filtered out.\n" +
+            "sketch=true estimates percentiles with t-digests, precision=N sizes distinct (default 14).",
+            component_class=cls
+        )
+        usage.def_syntax("agg:<keys>@<agg>=<field>,<agg>=<field>...")
+        usage.def_arg(name='keys', usage='comma separated fields to aggregate by')
+        usage.def_example(expr_tokens=["[{host:'a', bytes:10, ms:4}, {host:'b', bytes:5, ms:3}, {host:'a', bytes:20, ms:5}, {host:'b', bytes:1, ms:4}]",
+                                       'agg:host@sum=bytes,ave=ms'],
+                          expect="[{host:'a', count:2, sum_bytes:30, ave_ms:4.5}, {host:'b', count:2, sum_bytes:6, ave_ms:3.5}]")
+        usage.def_example(expr_tokens=["[{dc:'x', host:'a', m:{ms:4}}, {dc:'x', host:'a', m:{ms:9}}, {dc:'x'}]",
+                                       'agg:dc,host@max=m.ms'],
+                          expect="{dc:'x', host:'a', count:2, max_m_ms:9}")
+        return usage
+
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
+        keys = ptok.all_but_params.split(':', 1)[-1]
+        if not keys or keys == ptok.all_but_params:
+            raise TokenError("agg requires key fields, e.g. agg:host@sum=bytes")
+        self.keys = keys.split(',')
+
+        items = re.split(r'[@,]', ptok.whole_token.split('@', 1)[1]) if '@' in ptok.whole_token else []
+        params = {}
+        pairs = []
+        for item in items:
+            name, _, field = item.partition('=')
+            if not field:
+                raise TokenError(f"'{item}' is not <agg>=<field>")
+            if name in NAMED_AGG_PARAMS:
+                params[name] = field
+            elif is_named_agg(name):
+                pairs.append((name, field))
+            else:
+                raise TokenError(f"unknown aggregation: '{name}'")
+
+        # specs: (agg name, field path, acc params, output field)
+        self.specs = []
+        for name, field in pairs:
+            acc_params = {k: v for k, v in params.items()
+                          if (k == 'sketch' and percentile_of(name) is not None) or
+                             (k == 'precision' and name == 'distinct')}
+            new_named_acc(name, acc_params) # validates params
+            self.specs.append((name, tuple(field.split('.')), acc_params, f"{name}_{field.replace('.', '_')}"))
+
+        self.partials = get_partials(self)
+        self.recs_in = papi.get_counter(self, 'recs_in')
+        self.missing_keys = papi.get_counter(self, 'missing_keys')
+
+    def proc_splittable(self) -> bool:
+        return False # clones' tables are merged through partials
+
+    def new_entry(self):
+        """[count, acc, ...] for a newly seen key."""
+        return [0] + [new_named_acc(name, params) for name, _, params, _ in self.specs]
+
+    def merge_entry(self, entry, other):
+        entry[0] += other[0]
+        for i, (name, _, _, _) in enumerate(self.specs, 1):
+            entry[i] = merge_named_agg(name, entry[i], other[i])
+
+    def __iter__(self):
+        keys = self.keys
+        specs = self.specs
+        table = {}
+        for record in self.left:
+            key = tuple(record.get(k) for k in keys)
+            if None in key:
+                self.missing_keys.increment()
+                continue
+
+            self.recs_in.increment()
+            entry = table.get(key)
+            if entry is None:
+                entry = table[key] = self.new_entry()
+            entry[0] += 1
+            for i, (name, path, _, _) in enumerate(specs, 1):
+                entry[i] = eval_named_aggregation(name, named_agg_value(name, record, path), entry[i])
+
+        parts = self.partials.submit(table)
+        if parts is None:
+            return # another clone merges and emits
+
+        table = parts[0]
+        for part in parts[1:]:
+            for key, other in part.items():
+                entry = table.get(key)
+                if entry is None:
+                    table[key] = other
+                else:
+                    self.merge_entry(entry, other)
+
+        for key, entry in table.items():
+            out = dict(zip(keys, key))
+            out['count'] = entry[0]
+            for i, (name, _, _, out_field) in enumerate(specs, 1):
+                out[out_field] = finalize_named_agg(name, entry[i])
+            yield out
@@ -70,3 +70,13 @@ class DenormPipe(Pipe):
             for out in denormer:
                 self.recs_out.increment()
                 yield out
+
+    def iter_batches(self):
+        for batch in self.left.iter_batches():
+            self.recs_in.increment(len(batch))
+            out = []
+            for record in batch:
+                out.extend(Denormer(record, self.field))
+            if out:
+                self.recs_out.increment(len(out))
+                yield out
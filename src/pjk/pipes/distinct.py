@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# djk/pipes/distinct.py
+
+import threading
+from typing import List, Optional
+from pjk.components import DeepCopyPipe
+from pjk.usage import ParsedToken, Usage, TokenError
+from pjk.progress import papi
+from pjk.sketches import hash64, HashSet64, BloomFilter
+
+def def_key_set_params(usage: Usage):
+    """Params choosing how a set of keys is held, see new_key_set()."""
+    usage.def_param(name='mode', usage='exact keeps 64-bit key hashes, bloom a fixed size bloom filter',
+                    valid_values={'exact', 'bloom'}, default='exact')
+    usage.def_param(name='capacity', usage='keys the bloom filter is sized for', is_num=True, default='10000000')
+    usage.def_param(name='fp', usage='bloom filter false positive rate at capacity', is_num=True, default='0.01')
+
+def new_key_set(usage: Usage):
+    if usage.get_param('mode') == 'exact':
+        return HashSet64()
+    try:
+        return BloomFilter(int(usage.get_param('capacity')), float(usage.get_param('fp')))
+    except ValueError as e:
+        raise TokenError(f"{usage.name}: {e}")
+
+def key_hash(record: dict, fields: List[str]) -> Optional[int]:
+    """hash64 of the record's key, None if a key field is missing."""
+    if len(fields) == 1:
+        value = record.get(fields[0])
+        return None if value is None else hash64(value)
+    key = tuple(record.get(field) for field in fields)
+    return None if None in key else hash64(key)
+
+class DistinctPipe(DeepCopyPipe):
+    @classmethod
+    def usage(cls):
+        usage = Usage(
+            name='distinct',
+            desc="Streams out the first record of each key, keeping only key hashes, not records.\n" +
+            "Records without all key fields are filtered out.\n" +
+            "In bloom mode memory is fixed, a few records with new keys may be dropped as false positives.\n" +
+            "Under fan-out the clones share one set of keys.",
+            component_class=cls
+        )
+        usage.def_arg(name='fields', usage='comma separated fields making the key')
+        def_key_set_params(usage)
+        usage.def_example(expr_tokens=["[{id:1, n:1}, {id:2, n:2}, {id:1, n:3}, {n:4}, {id:3, n:5}, {id:2, n:6}]", 'distinct:id'],
+                          expect="[{id:1, n:1}, {id:2, n:2}, {id:3, n:5}]")
+        usage.def_example(expr_tokens=["[{a:1, b:'x'}, {a:1, b:'y'}, {a:1, b:'x'}]", 'distinct:a,b@mode=bloom@capacity=1000'],
+                          expect="[{a:1, b:'x'}, {a:1, b:'y'}]")
+        return usage
+
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
+        self.fields = usage.get_arg('fields').split(',')
+        if root is None:
+            self.seen_keys = new_key_set(usage)
+            self.lock = threading.Lock()
+        else: # clones share the root's keys
+            self.seen_keys = root.seen_keys
+            self.lock = root.lock
+
+        self.missing_keys = papi.get_counter(self, 'missing_keys')
+        self.recs_in = papi.get_counter(self, 'recs_in', display=False)
+        self.recs_out = papi.get_percentage_counter(self, 'recs_out', self.recs_in)
+
+    def proc_splittable(self) -> bool:
+        return False # seen keys are shared by the clones
+
+    def reset(self):
+        self.seen_keys = new_key_set(self.usage)
+
+    def __iter__(self):
+        fields = self.fields
+        lock = self.lock
+        for record in self.left:
+            h = key_hash(record, fields)
+            if h is None:
+                self.missing_keys.increment()
+                continue
+
+            self.recs_in.increment()
+            with lock:
+                is_new = self.seen_keys.add(h)
+            if is_new:
+                self.recs_out.increment()
+                yield record
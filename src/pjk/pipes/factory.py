@@ -12,9 +12,12 @@ from pjk.pipes.let_reduce import ReducePipe
 from pjk.pipes.head import HeadPipe
 from pjk.pipes.tail import TailPipe
 from pjk.pipes.sort import SortPipe
+from pjk.pipes.top import TopPipe
 from pjk.pipes.where import WherePipe
 from pjk.pipes.map import MapByPipe
 from pjk.pipes.map import GroupByPipe
+from pjk.pipes.keyset import KeySetPipe
+from pjk.pipes.agg import AggPipe
 from pjk.pipes.join import JoinPipe
 from pjk.pipes.filter import FilterPipe
 from pjk.pipes.select import SelectFields
@@ -23,6 +26,7 @@ from pjk.integrations.postgres_pipe import PostgresPipe
 from pjk.integrations.snowflake_pipe import SnowflakePipe
 from pjk.integrations.opensearch_query_pipe import OpenSearchQueryPipe
 from pjk.pipes.sample import SamplePipe
+from pjk.pipes.distinct import DistinctPipe
 from pjk.pipes.user_pipe_factory import UserPipeFactory
 from pjk.usage import Usage
 
@@ -67,14 +71,18 @@ COMPONENTS = {
         'filter': FilterPipe,
         'mapby': MapByPipe,            
         'groupby': GroupByPipe,
+        'keyset': KeySetPipe,
+        'agg': AggPipe,
         'as': MoveField,
         'drop': RemoveField,        
         'let': LetPipe,
         'reduce': ReducePipe,        
         'sort': SortPipe,
+        'top': TopPipe,
         'where': WherePipe,
         'select': SelectFields,
         'sample': SamplePipe,
+        'distinct': DistinctPipe,
         'explode': DenormPipe,
         'postgres': PostgresPipe,
         'snowflake': SnowflakePipe,
@@ -1,23 +1,24 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2024 Mike Schultz
 
-from pjk.components import Pipe, KeyedSource
+from pjk.components import BroadcastPipe, KeyedSource
 from pjk.usage import Usage, UsageError, ParsedToken
 from pjk.progress import papi
 
-class FilterPipe(Pipe):
-    arity = 2  # left = record stream, right = keyed source
+class FilterPipe(BroadcastPipe):
+    # left = record stream, right = keyed source shared by the clones of left
 
     @classmethod
     def usage(cls):
         usage = Usage(
             name="filter",
-            desc="Filters left records based on presence in right keyed source",
+            desc="Filters left records based on presence in right keyed source.\n" +
+            "Under fan-out the keyed source is built once and shared by all clones.",
             component_class=cls
         )
         usage.def_arg("mode", "'+' to include matches, '-' to exclude matches",
                       valid_values={'+', '-'})
-        usage.def_syntax("pjk <left_source> <map_source> [mapby:groupby]:<how>:<key> filter:<mode> <sink>")
+        usage.def_syntax("pjk <left_source> <map_source> [mapby|groupby|keyset]:<key> filter:<mode> <sink>")
 
         usage.def_example(expr_tokens=
         [
@@ -38,8 +39,8 @@ class FilterPipe(Pipe):
         expect="[{id:2}, {id:4}]")
         return usage
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
         self.mode = usage.get_arg('mode')
         self.left = None
         self.right = None
@@ -53,9 +54,8 @@ class FilterPipe(Pipe):
         if not isinstance(self.right, KeyedSource):
             raise UsageError("Right input to filter must be a KeyedSource")
 
-        for record in self.left:
+        for record, match in self.right.lookups(self.left):
             self.recs_in.increment()
-            match = self.right.lookup(record)
             exists = match is not None
             if (self.mode == "+" and exists) or (self.mode == "-" and not exists):
                 self.recs_out.increment()
@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# djk/pipes/fuse.py
+#
+# Planning step run after parsing: adjacent stateless pipes (where, let, select,
+# as, drop) are replaced by one FusedPipe whose per-record work is a single
+# generated function, so a chain costs one loop and one generator frame.
+# A fusable pipe implements fuse(fb) returning the source lines that apply it
+# to the local 'record'; 'continue' drops the record.
+
+from typing import List
+from pjk.components import Pipe, Sink
+
+MIN_RUN = 2 # a single pipe gains nothing from fusing
+
+class FuseBuilder:
+    def __init__(self, batch: bool):
+        self.batch = batch
+        self.ns = {}
+        self.counters = [] # (local name, SafeCounter), batch mode only
+
+    def bind(self, value) -> str:
+        """Make value visible to the generated code, returns its name there."""
+        name = f'v{len(self.ns)}'
+        self.ns[name] = value
+        return name
+
+    def count(self, counter) -> str:
+        """Statement counting one record on a progress counter."""
+        if not self.batch:
+            return f'{self.bind(counter)}.increment()'
+        name = f'n{len(self.counters)}'
+        self.counters.append((name, counter))
+        return f'{name} += 1'
+
+    def compile(self, pipes: List[Pipe]):
+        body = []
+        for pipe in pipes:
+            body.extend(pipe.fuse(self))
+        body = ['        ' + line for line in body]
+
+        if self.batch:
+            lines = ['def fused(batch):', '    out = []']
+            lines += [f'    {name} = 0' for name, _ in self.counters]
+            lines += ['    for record in batch:'] + body + ['        out.append(record)']
+            for name, counter in self.counters:
+                lines.append(f'    {self.bind(counter)}.increment({name})')
+            lines.append('    return out')
+        else:
+            lines = ['def fused(records):', '    for record in records:'] + body + ['        yield record']
+
+        source = '\n'.join(lines)
+        exec(compile(source, '<fused>', 'exec'), self.ns)
+        return self.ns['fused']
+
+def compile_fused(pipes: List[Pipe]):
+    return FuseBuilder(batch=False).compile(pipes), FuseBuilder(batch=True).compile(pipes)
+
+class FusedPipe(Pipe):
+    """A run of stateless pipes applied in one pass by a generated function."""
+
+    def __init__(self, pipes: List[Pipe], root = None, compiled = None):
+        super().__init__(None, None, root)
+        self.pipes = pipes # in execution order
+        self.fused_iter, self.fused_batch = compiled if compiled else compile_fused(pipes)
+
+    def reset(self):
+        for pipe in self.pipes:
+            pipe.reset()
+
+    def __iter__(self):
+        yield from self.fused_iter(self.left)
+
+    def iter_batches(self):
+        for batch in self.left.iter_batches():
+            out = self.fused_batch(batch)
+            if out:
+                yield out
+
+    def deep_copy(self):
+        source_clone = self.left.deep_copy()
+        if not source_clone:
+            return None
+
+        pipe = FusedPipe(self.pipes, root=self, compiled=(self.fused_iter, self.fused_batch))
+        pipe.add_source(source_clone)
+        return pipe
+
+def is_fusable(op) -> bool:
+    return isinstance(op, Pipe) and op.arity == 1 and hasattr(op, 'fuse')
+
+def _fuse_below(op):
+    """Fuse runs in each input of op, rewiring op to the fused pipes."""
+    for i, child in enumerate(op.inputs):
+        run = []
+        bottom = child
+        while is_fusable(bottom):
+            run.append(bottom)
+            bottom = bottom.left
+
+        if len(run) >= MIN_RUN:
+            run.reverse() # execution order, upstream first
+            fused = FusedPipe(run)
+            fused.add_source(bottom)
+            op.inputs[i] = fused
+            if op.left is child:
+                op.left = fused
+            if op.right is child:
+                op.right = fused
+
+        if isinstance(bottom, Pipe):
+            _fuse_below(bottom)
+
+def fuse_pipes(sink: Sink) -> Sink:
+    # the sink's input is always the ProgressPipe the parser put in front of it
+    _fuse_below(sink.input)
+    return sink
@@ -2,32 +2,80 @@
 # Copyright 2024 Mike Schultz
 
 # djk/pipes/head.py
-from pjk.components import Pipe
+import threading
+from pjk.components import DeepCopyPipe
 from pjk.usage import ParsedToken, Usage
 
-class HeadPipe(Pipe):
+class HeadBudget:
+    """Records a head and its deep_copy clones may still emit, shared through the root."""
+    def __init__(self, limit: int):
+        self.lock = threading.Lock()
+        self.limit = limit
+        self.remaining = limit
+
+    def take(self) -> int:
+        """Claim one record, returns how many are left after it or -1 if none was left."""
+        with self.lock:
+            if self.remaining <= 0:
+                return -1
+            self.remaining -= 1
+            return self.remaining
+
+    def spent(self) -> bool:
+        return self.remaining <= 0
+
+    def reset(self):
+        with self.lock:
+            self.remaining = self.limit
+
+class HeadPipe(DeepCopyPipe):
     @classmethod
     def usage(cls):
         usage = Usage(
             name='head',
-            desc='take first records of input',
+            desc='take first records of input\n' +
+            'Under fan-out clones share the limit, once it is reached upstream sources are cancelled.',
             component_class=cls
         )
         usage.def_example(expr_tokens=['[{id:1}, {id:2}]', 'head:1'], expect="{id:1}")
         usage.def_arg(name='limit', usage='number of records', is_num=True)
         return usage
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
         self.limit = usage.get_arg('limit')
-        self.count = 0
+        self.budget = root.budget if root is not None else HeadBudget(self.limit)
+
+    def add_source(self, source):
+        super().add_source(source)
+        source.push_limit(self.limit)
 
     def __iter__(self):
-        for record in self.left:
-            if self.count >= self.limit:
-                break
-            self.count += 1
-            yield record
-    
+        budget = self.budget
+        records = iter(self.left)
+        try:
+            for record in records:
+                remaining = budget.take()
+                if remaining < 0:
+                    break
+                yield record
+                if remaining == 0:
+                    break # don't pull another record just to drop it
+        finally:
+            if hasattr(records, 'close'):
+                records.close() # let upstream generators close their files
+        if budget.spent():
+            self.cancel_sources()
+
+    def cancel_sources(self):
+        """Stop upstream sources (and so the other clones) from starting more work."""
+        sources = [self.left]
+        self.left._get_sources(sources)
+        for source in sources:
+            source.cancel()
+
+    def proc_splittable(self) -> bool:
+        return False # the limit is a budget shared by the clones
+
     def reset(self):
-        self.count = 0
+        self.budget.reset()
@@ -3,18 +3,59 @@
 
 # djk/pipes/join.py
 
-from pjk.components import Pipe, KeyedSource
-from pjk.usage import Usage, UsageError, ParsedToken
+import os
+import shutil
+import tempfile
+from pjk.components import BroadcastPipe, KeyedSource, get_partials
+from pjk.usage import Usage, UsageError, ParsedToken, TokenError
 from pjk.progress import papi
+from pjk.pipes.sort import SPILL_CHUNK, write_run, read_run
+from pjk.sketches import hash64
 
-class JoinPipe(Pipe):
-    arity = 2  # left = record stream, right = KeyedSource
+GRACE_PARTITIONS = 64 # partitions per input once a grace join spills
+GRACE_MAX_DEPTH = 4   # times an oversized partition is partitioned again before it's joined anyway
+
+class _Partitions:
+    """
+    Records hash-partitioned by key into temp files, appended a chunk at a time.
+    A partition is split again with another seed and hash64, whose bits don't
+    follow hash()'s, so its keys spread rather than landing together again.
+    """
+    def __init__(self, tmp_dir: str, name: str, num: int, seed: int = 0):
+        self.seed = seed
+        self.paths = [os.path.join(tmp_dir, f'{name}-{i}') for i in range(num)]
+        self.buffers = [[] for _ in range(num)]
+        for path in self.paths:
+            open(path, 'wb').close()
+
+    def add(self, key, record):
+        if key is None:
+            i = 0
+        elif self.seed:
+            i = hash64((self.seed,) + key) % len(self.paths) # equal keys hash alike, as with hash()
+        else:
+            i = hash(key) % len(self.paths)
+        buffer = self.buffers[i]
+        buffer.append(record)
+        if len(buffer) >= SPILL_CHUNK:
+            write_run(self.paths[i], buffer, mode='ab')
+            buffer.clear()
+
+    def flush(self):
+        for path, buffer in zip(self.paths, self.buffers):
+            if buffer:
+                write_run(path, buffer, mode='ab')
+                buffer.clear()
+
+class JoinPipe(BroadcastPipe):
+    # left = record stream, right = KeyedSource shared by the clones of left (algo=hash)
 
     @classmethod
     def usage(cls):
         usage = Usage(
             name='join',
-            desc="Join records against a keyed source or concatentate sources",
+            desc="Join records against a keyed source or concatentate sources.\n" +
+            "Under fan-out a keyed source is built once and shared by all clones, merge, grace and concat don't fan out.",
             component_class=cls
         )
         usage.def_arg(
@@ -22,7 +63,15 @@ class JoinPipe(Pipe):
             usage="'left', 'inner', 'outer' or 'concat' behavior.",
             valid_values={'left', 'inner', 'outer', 'concat'}
         )
-        usage.def_syntax("pjk <left_source> <map_source> [mapby|groupby]:<key> join:<mode> <sink>")
+        usage.def_param(name='algo', usage="hash looks up a keyed source, merge walks two inputs sorted by key,\n" +
+                        "  grace hashes the right input by key, spilling both inputs to partition files beyond buffer",
+                        valid_values={'hash', 'merge', 'grace'}, default='hash')
+        usage.def_param(name='key', usage='comma separated key fields, for algo=merge or grace')
+        usage.def_param(name='buffer', usage='max distinct right keys (not records or bytes) held in memory, for algo=grace,\n' +
+                        '  a partition with more is partitioned again', is_num=True, default='1000000')
+        usage.def_syntax("pjk <left_source> <map_source> [mapby|groupby]:<key> join:<mode> <sink>\n" +
+                         "  pjk <left_sorted> <right_sorted> join:<mode>@algo=merge@key=<key> <sink>\n" +
+                         "  pjk <left_source> <right_source> join:<mode>@algo=grace@key=<key> <sink>")
 
         usage.def_example(expr_tokens=
         [
@@ -57,12 +106,36 @@ class JoinPipe(Pipe):
             "join:concat"
         ],
         expect="[{color:'blue'}, {color:'green'}, {color: 'blue', price:50}, {color:'red', price: 20}]")
+
+        usage.def_example(expr_tokens=
+        [
+            "[{id:1, a:'x'}, {id:2, a:'y'}, {id:2, a:'z'}, {id:4, a:'w'}]",
+            "[{id:2, b:5}, {id:3, b:6}, {id:4, b:7}, {id:4, b:8}]",
+            "join:outer@algo=merge@key=id"
+        ],
+        expect="[{id:1, a:'x'}, {id:2, a:'y', b:5}, {id:2, a:'z', b:5}, {id:3, b:6}, {id:4, a:'w', b:8}]")
+
+        usage.def_example(expr_tokens=
+        [
+            "[{id:3, a:'x'}, {id:1, a:'y'}, {id:5, a:'z'}]",
+            "[{id:1, b:5}, {id:3, b:6}, {id:4, b:7}]",
+            "join:inner@algo=grace@key=id@buffer=1",
+            "sort:+id"
+        ],
+        expect="[{id:1, a:'y', b:5}, {id:3, a:'x', b:6}]")
         return usage
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
 
         self.mode = usage.get_arg('mode')
+        self.algo = usage.get_param('algo')
+        key = usage.get_param('key')
+        self.key_fields = key.split(',') if key else None
+        if self.algo != 'hash' and (self.mode == 'concat' or not self.key_fields):
+            raise TokenError(f"join@algo={self.algo} needs a left, inner or outer mode and @key=<fields>")
+        self.buffer_limit = max(1, int(usage.get_param('buffer')))
+        self._tmp_dir = None # grace join partition files
         self.left = None
         self.right = None
         self._pending_right = None
@@ -71,10 +144,26 @@ class JoinPipe(Pipe):
         self.recs_in = papi.get_counter(self, 'recs_in', display=False) 
         self.matches = papi.get_percentage_counter(self, 'matches', self.recs_in)
         self.recs_out = papi.get_counter(self, 'recs_out')
+        if self.broadcasts() and self.mode == 'outer':
+            self.partials = get_partials(self) # the last clone to finish adds the unmatched right
+
+    def broadcasts(self) -> bool:
+        # merge and grace read the whole right input, concat streams it
+        return self.mode != 'concat' and self.algo == 'hash'
 
     def reset(self):
         self._pending_right = None
         self._check_right = False
+        self._remove_partitions()
+
+    def close(self):
+        self._remove_partitions()
+        super().close()
+
+    def _remove_partitions(self):
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
 
     def concat_iter(self):
         for rec in self.left:
@@ -89,12 +178,23 @@ class JoinPipe(Pipe):
             yield from self.concat_iter()
             return
 
+        if self.algo == 'merge':
+            yield from self.merge_iter()
+            return
+
+        if self.algo == 'grace':
+            yield from self.grace_iter()
+            return
+
         if not isinstance(self.right, KeyedSource):
             raise UsageError("right source must be a KeyedSource")
+        if self.mode == 'outer' and not self.right.listable:
+            raise UsageError(f"join:outer can't list the unmatched records of {type(self.right).usage().name}, use join:left")
+        if self.mode == 'outer':
+            self.right.track_matched = True
 
-        for left_rec in self.left:
+        for left_rec, match in self.right.lookups(self.left):
             self.recs_in.increment()
-            match = self.right.lookup(left_rec)
 
             if match is not None:
                 self.matches.increment()
@@ -112,6 +212,153 @@ class JoinPipe(Pipe):
                 continue
 
         if self.mode == "outer":
+            if self.partials.submit(None) is None:
+                return # another clone is still looking up
             for right_rec in self.right.get_unlookedup_records():
                 self.recs_out.increment()
                 yield right_rec
+
+    def key_of(self, record):
+        key = tuple(record.get(field) for field in self.key_fields)
+        return None if None in key else key
+
+    def right_groups(self):
+        """(key, record) per key of the sorted right input, the last record of duplicates as with mapby."""
+        key = rec = None
+        for record in self.right:
+            k = self.key_of(record)
+            if k is None:
+                continue # no key, filtered out as mapby would
+            if rec is not None and k != key:
+                if k < key:
+                    raise ValueError(f"join@algo=merge: right input not sorted by {self.key_fields}, {k} after {key}")
+                yield key, rec
+            key, rec = k, record
+        if rec is not None:
+            yield key, rec
+
+    def merge_iter(self):
+        """Sort-merge join of inputs both sorted ascending by key, holding one right record at a time."""
+        outer = self.mode == 'outer'
+        groups = self.right_groups()
+        right_key, right_rec = next(groups, (None, None))
+        matched = False # whether right_rec has matched a left record
+        prev_key = None
+
+        for left_rec in self.left:
+            self.recs_in.increment()
+            key = self.key_of(left_rec)
+            if key is not None:
+                if prev_key is not None and key < prev_key:
+                    raise ValueError(f"join@algo=merge: left input not sorted by {self.key_fields}, {key} after {prev_key}")
+                prev_key = key
+
+                while right_rec is not None and right_key < key:
+                    if outer and not matched:
+                        self.recs_out.increment()
+                        yield right_rec
+                    right_key, right_rec = next(groups, (None, None))
+                    matched = False
+
+                if right_rec is not None and right_key == key:
+                    matched = True
+                    self.matches.increment()
+                    self.recs_out.increment()
+                    merged = dict(left_rec)
+                    merged.update(right_rec)
+                    yield merged
+                    continue
+
+            if self.mode != 'inner':
+                self.recs_out.increment()
+                yield left_rec
+
+        if outer:
+            while right_rec is not None:
+                if not matched:
+                    self.recs_out.increment()
+                    yield right_rec
+                right_key, right_rec = next(groups, (None, None))
+                matched = False
+
+    def grace_iter(self):
+        """
+        Hash join with the right input as the build side.  While it holds no more
+        than buffer keys the table stays in memory and the left input streams past
+        it, beyond that both inputs are hash-partitioned to temp files and joined a
+        partition at a time, a partition still over buffer keys partitioned again.
+        Duplicate right keys keep the last record as with mapby.
+        """
+        table = {}
+        right = iter(self.right)
+        for record in right:
+            key = self.key_of(record)
+            if key is None:
+                continue # no key, filtered out as mapby would
+            table[key] = record
+            if len(table) > self.buffer_limit:
+                self._tmp_dir = tempfile.mkdtemp(prefix='pjk-join-')
+                yield from self.grace_spilled(table, right, self.left)
+                self._remove_partitions()
+                return
+
+        yield from self.probe(self.left, table)
+
+    def grace_spilled(self, table: dict, right, left, part: str = '', depth: int = 0):
+        """Partition the table and the rest of right, then left, and join them a partition at a time."""
+        right_parts = _Partitions(self._tmp_dir, f'right{part}', GRACE_PARTITIONS, seed=depth)
+        for key, record in table.items():
+            right_parts.add(key, record)
+        table.clear()
+        for record in right: # later duplicates follow in their partition, so still win
+            key = self.key_of(record)
+            if key is not None:
+                right_parts.add(key, record)
+        right_parts.flush()
+
+        left_parts = _Partitions(self._tmp_dir, f'left{part}', GRACE_PARTITIONS, seed=depth)
+        for record in left:
+            left_parts.add(self.key_of(record), record)
+        left_parts.flush()
+
+        for i, (right_path, left_path) in enumerate(zip(right_parts.paths, left_parts.paths)):
+            yield from self.join_partition(right_path, left_path, f'{part}-{i}', depth)
+            os.remove(right_path)
+            os.remove(left_path)
+
+    def join_partition(self, right_path: str, left_path: str, part: str, depth: int):
+        table = {}
+        right = read_run(right_path)
+        for record in right:
+            table[self.key_of(record)] = record
+            if len(table) > self.buffer_limit and depth < GRACE_MAX_DEPTH:
+                yield from self.grace_spilled(table, right, read_run(left_path), part, depth + 1)
+                return
+        yield from self.probe(read_run(left_path), table)
+
+    def probe(self, left_recs, table: dict):
+        """Join left_recs against a table of right records by key, then any unmatched right for outer."""
+        outer = self.mode == 'outer'
+        matched = set()
+        for left_rec in left_recs:
+            self.recs_in.increment()
+            key = self.key_of(left_rec)
+            match = table.get(key) if key is not None else None
+
+            if match is not None:
+                if outer:
+                    matched.add(key)
+                self.matches.increment()
+                self.recs_out.increment()
+                merged = dict(left_rec)
+                merged.update(match)
+                yield merged
+            elif self.mode != 'inner':
+                self.recs_out.increment()
+                yield left_rec
+
+        if outer:
+            for key, right_rec in table.items():
+                if key not in matched:
+                    self.recs_out.increment()
+                    yield right_rec
@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# djk/pipes/keyset.py
+
+import threading
+from typing import Optional
+from pjk.components import Pipe, KeyedSource
+from pjk.usage import ParsedToken, Usage
+from pjk.progress import papi
+from pjk.pipes.distinct import def_key_set_params, new_key_set, key_hash
+
+class KeySetPipe(Pipe, KeyedSource):
+    listable = False # only hashes are kept, join:outer has no right records to add
+    @classmethod
+    def usage(cls):
+        u = Usage(
+            name='keyset',
+            desc="Keyed Source holding only hashes of its records' keys, for filter (or inner join on the key).\n" +
+            "Filters out records without all key fields. Yields a single {keys:N} record when not used as a keyed source.\n" +
+            "In bloom mode memory is fixed, a few keys not in the set may match as false positives.",
+            component_class=cls
+        )
+        u.def_arg(name='key', usage='comma separated fields making the key')
+        def_key_set_params(u)
+        u.def_example(expr_tokens=["[{id:1}, {id:2}, {id:3}, {id:4}]", "[{id:2}, {id:4}, {id:4}]", 'keyset:id', 'filter:-'],
+                      expect="[{id:1}, {id:3}]")
+        u.def_example(expr_tokens=["[{id:1, k:'a'}, {id:2, k:'b'}]", "[{id:2, k:'b'}]", 'keyset:id,k@mode=bloom@capacity=100', 'filter:+'],
+                      expect="{id:2, k:'b'}")
+        return u
+
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
+        self.fields = usage.get_arg('key').split(',')
+        self.keys = new_key_set(usage)
+        self.is_loaded = False
+        self.load_lock = threading.Lock()
+        self.missing_keys = papi.get_counter(self, 'missing_keys')
+        self.recs_in = papi.get_counter(self, 'recs_in', display=False)
+        self.distinct_keys = papi.get_percentage_counter(self, 'keys', self.recs_in)
+
+    def reset(self):
+        self.keys = new_key_set(self.usage)
+        self.is_loaded = False
+
+    def load(self):
+        # as the right side of a join or filter, lookups come from every clone's thread
+        with self.load_lock:
+            if not self.is_loaded:
+                self._load()
+                self.is_loaded = True
+
+    def _load(self):
+        fields = self.fields
+        keys = self.keys
+        for record in self.left:
+            h = key_hash(record, fields)
+            if h is None:
+                self.missing_keys.increment()
+                continue
+            self.recs_in.increment()
+            if keys.add(h):
+                self.distinct_keys.increment()
+
+    def __iter__(self):
+        self.load()
+        yield {'keys': len(self.keys)}
+
+    def lookup(self, left_rec) -> Optional[dict]:
+        if not self.is_loaded:
+            self.load()
+        h = key_hash(left_rec, self.fields)
+        if h is None or h not in self.keys:
+            return None
+        return {field: left_rec[field] for field in self.fields}
+
+    def get_unlookedup_records(self):
+        raise ValueError("keyset keeps only key hashes, it has no records to list")
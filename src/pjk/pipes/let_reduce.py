@@ -4,8 +4,9 @@
 # djk/pipes/let_reduce.py
 
 from pjk.components import DeepCopyPipe
-from pjk.usage import ParsedToken, Usage, UsageError, TokenError, NoBindUsage
-from pjk.common import SafeNamespace, ReducingNamespace
+from pjk.usage import ParsedToken, Usage, TokenError, NoBindUsage
+from pjk.sketches import TDigest, HyperLogLog
+from pjk.common import ReducingNamespace, get_path, compile_record_expr, record_globals
 import math
 import re
 import ast
@@ -19,65 +20,18 @@ def parse_args(token: str):
         raise ValueError(f"Invalid token syntax: {token!r}")
     return match.groupdict()
 
-def do_eval(expr, env):
-    try:
-        safe_env = dict(env)
-        safe_env['json'] = json
-        safe_env['re'] = re
-        return eval(expr, {}, safe_env)
-    except Exception:
-        raise Exception(f"Error in expression: {expr}")
-
-def eval_regular(expr: str, record: dict):
-    env = {'f': SafeNamespace(record)}
-    if re.match(r'[a-zA-Z0-9_]+$', expr):
-        return expr
-    return do_eval(expr, env)
-
-def eval_accumulating(expr: str, record: dict, op: str, acc=None):
-    if op in ('-=', '*=', '/=') and 'acc' not in expr:
-        expr = f'acc {op[0]} ({expr})'
-
-    env = {
-        'f': SafeNamespace(record),
-        'acc': acc
-    }
-
-    try:
-        node = ast.parse(expr, mode='eval').body
-    except SyntaxError:
-        raise UsageError(f"Invalid expression: {expr}")
-
-    if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp)):
-        env['f'] = ReducingNamespace(record)
-
-    if isinstance(node, ast.ListComp):
-        values = eval(compile(ast.Expression(node), '<reduce:listcomp>', 'eval'), {}, env)
-        return (acc or []) + list(values)
-
-    if isinstance(node, ast.SetComp):
-        values = eval(compile(ast.Expression(node), '<reduce:setcomp>', 'eval'), {}, env)
-        return (acc or set()).union(values)
-
-    if isinstance(node, ast.DictComp):
-        values = eval(compile(ast.Expression(node), '<reduce:dictcomp>', 'eval'), {}, env)
-        return {**(acc or {}), **values}
-
-    if op == '+=':
-        value = eval(expr, {}, env)
-        if isinstance(value, (int, float)):
-            return (acc or 0) + value
-        elif isinstance(value, str):
-            return str(acc or '') + value
-        elif isinstance(value, list):
-            return (acc or []) + value
-        else:
-            return (acc or []) + [value]
-
-    if op in ('-=', '*=', '/='):
-        return do_eval(expr, env)
-
-    return do_eval(expr, env)
+def accumulate_plus(acc, value):
+    """acc += value for reduce: numbers add, strings concat, anything else collects into a list."""
+    if isinstance(value, (int, float)):
+        return (acc or 0) + value
+    elif isinstance(value, str):
+        return str(acc or '') + value
+    if not isinstance(value, list):
+        value = [value]
+    if not acc:
+        return list(value) # never alias a record's list
+    acc.extend(value) # acc is owned by the reducer, extend in place
+    return acc
 
 # --- LetPipe (simple field assignment) ---
 class LetPipe(DeepCopyPipe):
@@ -94,8 +48,8 @@ class LetPipe(DeepCopyPipe):
         usage.def_example(expr_tokens=['{hello:0}', 'let:foo=int(1)'], expect="{hello:0, foo: 1}")        
         return usage
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
         args = parse_args(ptok.whole_token.split(':', 1)[-1])
         self.field = args['field']
         self.op = args['op']
@@ -104,31 +58,88 @@ class LetPipe(DeepCopyPipe):
         if self.op in ('+=', '-=', '*=', '/='):
             raise TokenError("Aggregation operator not allowed in let, use reduce:")
 
+        # let:foo:bar and bare words (let:foo=bar) are literal strings
+        self.is_literal = self.op == ':' or re.match(r'[a-zA-Z0-9_]+$', self.rest) is not None
+        if not self.is_literal:
+            try:
+                self.code = compile_record_expr(self.rest, '<let>')
+            except SyntaxError:
+                raise TokenError(f"Invalid let expression: {self.rest}")
+            self.env = record_globals(json=json, re=re)
+
     def reset(self):
         pass  # stateless
 
+    def eval_rhs(self, record: dict):
+        try:
+            return eval(self.code, self.env, {'f': record})
+        except Exception:
+            raise Exception(f"Error in expression: {self.rest}")
+
     def __iter__(self):
         for record in self.left:
-            if self.op == ':':
+            if self.is_literal:
                 record[self.field] = self.rest
             else:
-                record[self.field] = eval_regular(self.rest, record)
+                record[self.field] = self.eval_rhs(record)
             yield record
 
-# --- Named aggregations (ave, sum, min, max) ---
-# Match agg:f.field or agg:f.field.subfield (must use f. prefix)
-NAMED_AGG_PATTERN = re.compile(r'^(\w+):f\.([\w.]+)$')
-NAMED_AGGS = frozenset(('ave', 'sum', 'min', 'max', 'p50', 'p75', 'p90'))
-PERCENTILE_MAP = {'p50': 50, 'p75': 75, 'p90': 90}
+    def iter_batches(self):
+        for batch in self.left.iter_batches():
+            if self.is_literal:
+                for record in batch:
+                    record[self.field] = self.rest
+            else:
+                for record in batch:
+                    record[self.field] = self.eval_rhs(record)
+            yield batch
 
+    def fuse(self, fb):
+        if self.is_literal:
+            return [f'record[{self.field!r}] = {self.rest!r}']
+        return [f'record[{self.field!r}] = {fb.bind(self.eval_rhs)}(record)']
 
-def _get_nested(ns, path: str):
-    """Resolve dot path (e.g. 'size' or 'address.zip') against SafeNamespace."""
-    for part in path.split('.'):
-        ns = getattr(ns, part, None)
-        if ns is None:
-            return None
-    return ns
+# --- Named aggregations (ave, sum, min, max) ---
+# Match agg:f.field or agg:f.field.subfield (must use f. prefix)
+# Params follow the field: p99:f.latency@sketch=true
+NAMED_AGG_PATTERN = re.compile(r'^(\w+):f\.([\w.]+)(@.*)?$')
+NAMED_AGGS = frozenset(('ave', 'sum', 'min', 'max', 'distinct'))
+PERCENTILE_PATTERN = re.compile(r'^p(\d{1,2}|100)$') # p0 .. p100
+NAMED_AGG_PARAMS = {
+    'sketch': ('true', 'false'),
+    'precision': tuple(str(p) for p in range(HyperLogLog.MIN_PRECISION, HyperLogLog.MAX_PRECISION + 1)),
+}
+DISTINCT_PRECISION = 14 # 16K registers, ~0.8% standard error
+
+
+def percentile_of(agg_name: str):
+    """50 for 'p50', None if agg_name isn't a percentile."""
+    m = PERCENTILE_PATTERN.match(agg_name)
+    return int(m.group(1)) if m else None
+
+
+def is_named_agg(agg_name: str) -> bool:
+    return agg_name in NAMED_AGGS or percentile_of(agg_name) is not None
+
+
+def new_named_acc(agg_name: str, params: dict):
+    """Initial accumulator: None, or a sketch for distinct and p99:f.x@sketch=true."""
+    for name, value in params.items():
+        valid = NAMED_AGG_PARAMS.get(name)
+        if not valid:
+            raise TokenError(f"unknown named aggregation param: '{name}'")
+        if value not in valid:
+            raise TokenError(f"'{name}' param must be one of: {', '.join(valid)}")
+
+    if params.get('sketch') == 'true':
+        if percentile_of(agg_name) is None:
+            raise TokenError("@sketch=true only applies to percentiles (p50, p99, etc.)")
+        return TDigest()
+    if 'precision' in params and agg_name != 'distinct':
+        raise TokenError("@precision only applies to distinct")
+    if agg_name == 'distinct':
+        return HyperLogLog(int(params.get('precision', DISTINCT_PRECISION)))
+    return None
 
 
 def _to_number(val):
@@ -145,10 +156,13 @@ def _to_number(val):
     return None
 
 
-def eval_named_aggregation(agg_name: str, field_path: str, record: dict, acc):
-    ns = SafeNamespace(record)
-    val = _to_number(_get_nested(ns, field_path))
+def named_agg_value(agg_name: str, record: dict, path: tuple):
+    """The record's value at path as the aggregation takes it: a number, or raw for distinct."""
+    val = get_path(record, path)
+    return val if agg_name == 'distinct' else _to_number(val)
+
 
+def eval_named_aggregation(agg_name: str, val, acc):
     if agg_name == 'ave':
         s, n = acc or (0, 0)
         if val is not None:
@@ -171,11 +185,36 @@ def eval_named_aggregation(agg_name: str, field_path: str, record: dict, acc):
         if acc is None:
             return val
         return max(acc, val)
-    elif agg_name in PERCENTILE_MAP:
+    elif agg_name == 'distinct':
         if val is not None:
-            lst = acc if acc is not None else []
-            lst.append(val)
-            return lst
+            acc.add(val)
+    elif val is not None: # percentile: exact list or sketch
+        if acc is None:
+            acc = []
+        if isinstance(acc, TDigest):
+            acc.add(val)
+        else:
+            acc.append(val)
+    return acc
+
+
+def merge_named_agg(agg_name: str, acc, other):
+    """Combine two partial accumulators of the same named aggregation."""
+    if acc is None:
+        return other
+    if other is None:
+        return acc
+    if agg_name == 'ave':
+        return (acc[0] + other[0], acc[1] + other[1])
+    elif agg_name == 'sum':
+        return acc + other
+    elif agg_name == 'min':
+        return min(acc, other)
+    elif agg_name == 'max':
+        return max(acc, other)
+    elif isinstance(acc, (TDigest, HyperLogLog)):
+        return acc.merge(other)
+    acc.extend(other)
     return acc
 
 
@@ -193,22 +232,34 @@ def finalize_named_agg(agg_name: str, acc):
     if agg_name == 'ave':
         s, n = acc or (0, 0)
         return s / n if n else 0
-    if agg_name in PERCENTILE_MAP:
+    if agg_name == 'distinct':
+        return acc.count()
+    p = percentile_of(agg_name)
+    if p is not None:
+        if isinstance(acc, TDigest):
+            return acc.quantile(p / 100)
         vals = acc or []
         if not vals:
             return 0
         vals.sort()
-        return _percentile(vals, PERCENTILE_MAP[agg_name])
+        return _percentile(vals, p)
     return acc
 
 
 # --- ReducePipe (stateful accumulator) ---
-def is_comprehension(expr: str) -> bool:
+COMPREHENSIONS = {ast.ListComp: 'listcomp', ast.SetComp: 'setcomp', ast.DictComp: 'dictcomp'}
+PLUS_FIELD_PATTERN = re.compile(r'^f\.(\w+)$')
+
+def parse_rhs(expr: str):
+    """Parsed rhs node, or None if it isn't valid python."""
     try:
-        node = ast.parse(expr, mode='eval').body
-        return isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp))
+        return ast.parse(expr, mode='eval').body
     except SyntaxError:
-        return False
+        return None
+
+def reads_acc(node) -> bool:
+    """Whether a parsed rhs reads the accumulator as acc."""
+    return node is not None and any(isinstance(n, ast.Name) and n.id == 'acc' for n in ast.walk(node))
 
 class ReducePipe(DeepCopyPipe):
     @classmethod
@@ -217,7 +268,9 @@ class ReducePipe(DeepCopyPipe):
             name='reduce',
             desc="set a new field equal to a reduction over records of a sub or main expression\n" +
             "rhs operators must be accumulating, e.g. +=, -=, *=, /=\n" +
-            "or use list/dict comprehension, or named agg: ave:f.field, sum:f.field, p50:f.field, etc. (supports f.field.subfield)",
+            "or use list/dict comprehension, or named agg: ave:f.field, sum:f.field, p50:f.field, etc. (supports f.field.subfield)\n" +
+            "percentiles pNN:f.field are exact; append @sketch=true for a bounded-memory t-digest estimate\n" +
+            "distinct:f.field estimates the number of distinct values (HyperLogLog, @precision=4..18, default 14)",
             component_class=cls
         )
         usage.def_arg(name='rhs', usage="accumulating python rhs expression (use f.<field> syntax)")
@@ -272,35 +325,84 @@ class ReducePipe(DeepCopyPipe):
                                        ],
                         expect="{p75: 3}")
 
+        usage.def_example(expr_tokens=["[{ms:1},{ms:2},{ms:3}]",
+                                       'reduce:med=p50:f.ms@sketch=true'
+                                       ],
+                        expect="{med: 2}")
+
+        usage.def_example(expr_tokens=["{visits:[{user:'ann'}, {user:'bo'}, {user:'ann'}]}",
+                                       '[', 'reduce:users=distinct:f.user', 'over:visits'
+                                       ],
+                        expect="{visits:[{user:'ann'}, {user:'bo'}, {user:'ann'}], users: 2}")
+
         return usage
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
         args = parse_args(ptok.whole_token.split(':', 1)[-1])
         self.field = args['field']
         self.op = args['op']
         self.rest = args['rest']
         self.named_agg = None
+        node = parse_rhs(self.rest)
+        comp_kind = COMPREHENSIONS.get(type(node))
 
         if self.op == '=':
             m = NAMED_AGG_PATTERN.match(self.rest)
-            if m and m.group(1) in NAMED_AGGS:
+            if m and is_named_agg(m.group(1)):
                 self.named_agg = (m.group(1), m.group(2))
-            elif is_comprehension(self.rest):
+                self.agg_params = ptok.get_params() if m.group(3) else {}
+            elif comp_kind:
                 self.op = '+='
             else:
                 raise TokenError("Named aggregation requires f. prefix (e.g. ave:f.size, ave:f.field.subfield)")
         elif self.op not in ('+=', '-=', '*=', '/='):
-            if is_comprehension(self.rest):
+            if comp_kind:
                 self.op = '+='
             else:
                 raise TokenError("Reduce pipe requires an accumulating operator (+=, -=, etc.), unless RHS is a comprehension or named agg (ave:f.field, sum:f.field, etc.)")
 
+        # classify once, so per record there is one eval or a specialized step
+        self.expr = self.rest
+        uses_acc = reads_acc(node)
+        self.mergeable = not uses_acc # acc used freely, partials can't be combined
+        if self.op != '+=':
+            comp_kind = None # acc -= [...] folds like any other expression
+        if self.named_agg:
+            self.kind = 'named'
+            self.agg_name = self.named_agg[0]
+            self.agg_path = tuple(self.named_agg[1].split('.'))
+            new_named_acc(self.agg_name, self.agg_params) # validates params
+        elif comp_kind:
+            self.kind = comp_kind
+        elif self.op == '+=':
+            m = PLUS_FIELD_PATTERN.match(self.rest)
+            self.kind = 'plus_field' if m else 'plus'
+            self.plus_field = m.group(1) if m else None
+        else:
+            self.kind = 'fold'
+            if not uses_acc:
+                self.expr = f'acc {self.op[0]} ({self.expr})'
+
+        if self.kind != 'named':
+            if comp_kind:
+                # comprehensions iterate f.<field> as lists, see ReducingNamespace
+                if node is None:
+                    raise TokenError(f"Invalid expression: {self.expr}")
+                self.code = compile(ast.Expression(node), f'<reduce:{comp_kind}>', 'eval')
+            else:
+                try:
+                    self.code = compile_record_expr(self.expr, '<reduce>')
+                except SyntaxError:
+                    raise TokenError(f"Invalid expression: {self.expr}")
+            self.env = record_globals(json=json, re=re)
+
+        self.step = getattr(self, f'step_{self.kind}')
         self.accum_value = self.initial_acc_value()
 
     def initial_acc_value(self):
         if self.named_agg:
-            return None
+            return new_named_acc(self.agg_name, self.agg_params)
         if self.op == '+=':
             return 0
         elif self.op == '*=':
@@ -315,15 +417,90 @@ class ReducePipe(DeepCopyPipe):
     def reset(self):
         self.accum_value = self.initial_acc_value()
 
+    def eval_rhs(self, f):
+        try:
+            return eval(self.code, self.env, {'f': f, 'acc': self.accum_value})
+        except Exception:
+            raise Exception(f"Error in expression: {self.expr}")
+
+    def step_named(self, record: dict):
+        val = named_agg_value(self.agg_name, record, self.agg_path)
+        self.accum_value = eval_named_aggregation(self.agg_name, val, self.accum_value)
+
+    def step_plus_field(self, record: dict):
+        value = record.get(self.plus_field)
+        acc = self.accum_value
+        if isinstance(value, (int, float)) and isinstance(acc, (int, float)):
+            self.accum_value = acc + value
+        else:
+            self.accum_value = accumulate_plus(acc, value)
+
+    def step_plus(self, record: dict):
+        self.accum_value = accumulate_plus(self.accum_value, self.eval_rhs(record))
+
+    def step_fold(self, record: dict):
+        self.accum_value = self.eval_rhs(record)
+
+    def step_listcomp(self, record: dict):
+        values = self.eval_rhs(ReducingNamespace(record))
+        acc = self.accum_value or []
+        acc.extend(values)
+        self.accum_value = acc
+
+    def step_setcomp(self, record: dict):
+        values = self.eval_rhs(ReducingNamespace(record))
+        acc = self.accum_value or set()
+        acc.update(values)
+        self.accum_value = acc
+
+    def step_dictcomp(self, record: dict):
+        values = self.eval_rhs(ReducingNamespace(record))
+        acc = self.accum_value or {}
+        acc.update(values)
+        self.accum_value = acc
+
     def __iter__(self):
+        step = self.step
         for record in self.left:
-            if self.named_agg:
-                agg_name, field_name = self.named_agg
-                self.accum_value = eval_named_aggregation(agg_name, field_name, record, self.accum_value)
-            else:
-                self.accum_value = eval_accumulating(self.rest, record, self.op, self.accum_value)
+            step(record)
             yield record
 
+    def iter_batches(self):
+        step = self.step
+        for batch in self.left.iter_batches():
+            for record in batch:
+                step(record)
+            yield batch
+
+    def merge_accum(self, acc, other):
+        """Combine two partial accumulators from clones of this reducer."""
+        kind = self.kind
+        if kind == 'named':
+            return merge_named_agg(self.agg_name, acc, other)
+        if kind == 'listcomp':
+            acc = acc or []
+            acc.extend(other or [])
+            return acc
+        if kind in ('setcomp', 'dictcomp'):
+            acc = acc or (set() if kind == 'setcomp' else {})
+            acc.update(other or ())
+            return acc
+        if kind in ('plus', 'plus_field'):
+            if isinstance(other, (int, float)) and not other and not isinstance(acc, (int, float)):
+                return acc # other clone saw nothing
+            return accumulate_plus(acc, other)
+        # folds apply one op from their initial value: 0 - a - b, 1 * a * b, 1.0 / a / b
+        if self.op == '-=':
+            return acc + other
+        return acc * other
+
+    def merge_partials(self, accs: list):
+        """Sets the accumulator to the combination of the clones' accumulators."""
+        acc = accs[0]
+        for other in accs[1:]:
+            acc = self.merge_accum(acc, other)
+        self.accum_value = acc
+
     def get_subexp_result(self):
         if self.named_agg:
             agg_name, _ = self.named_agg
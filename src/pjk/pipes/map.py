@@ -3,17 +3,19 @@
 
 # djk/pipes/group.py
 
+import threading
 from typing import Optional
-from pjk.components import Pipe, KeyedSource
+from pjk.components import DeepCopyPipe, KeyedSource, get_partials
 from pjk.usage import ParsedToken, Usage
 from pjk.progress import papi
 
-class MapByPipe(Pipe, KeyedSource):
+class MapByPipe(DeepCopyPipe, KeyedSource):
     @classmethod
     def usage(cls):
         u = Usage(
             name='mapby',
-            desc="Maps records to key, taking last instance of duplicates.\nFilters out records without all key fields.\nCreates Keyed Source for join or filter.",
+            desc="Maps records to key, taking last instance of duplicates.\nFilters out records without all key fields.\nCreates Keyed Source for join or filter.\n" +
+            "Under fan-out each clone maps its share of the input and the maps are merged at the end.",
             component_class=cls
         )
         u.def_arg(name='key', usage='comma separated fields to map by')
@@ -27,23 +29,30 @@ class MapByPipe(Pipe, KeyedSource):
 
         return u
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
         self.is_group = False
         self.fields = usage.get_arg('key').split(',')
         self.rec_map = {}
-        self.matched_map = {}
+        self.matched = set() # keys looked up, only when track_matched for outer join
         self.is_loaded = False
+        self.load_lock = threading.Lock()
         self.do_count = usage.get_param(name='count').lower() == 'true'
         self.counts = {}
         self.missing_keys = papi.get_counter(self, 'missing_keys')
         self.recs_in = papi.get_counter(self, 'recs_in', display=False)
         # recs_out = distinct_keys
         self.distinct_keys = papi.get_percentage_counter(self, 'recs_out', self.recs_in)
+        self.partials = get_partials(self)
+
+    def proc_splittable(self) -> bool:
+        return False # clones' maps are merged through partials
 
     def reset(self):
-        self.rec_map.clear()
-        self.matched_map.clear()
+        # new dicts, a merging clone may have taken the old ones
+        self.rec_map = {}
+        self.matched = set()
+        self.counts = {}
         self._rec_list = None
         self.is_loaded = False
 
@@ -64,10 +73,13 @@ class MapByPipe(Pipe, KeyedSource):
         self.counts[key] = i+1
 
     def load(self):
-        if self.is_loaded:
-            return
-        self.is_loaded = True
+        # as the right side of a join or filter, lookups come from every clone's thread
+        with self.load_lock:
+            if not self.is_loaded:
+                self._load()
+                self.is_loaded = True
 
+    def _load(self):
         for record in self.left:
             key_rec = self.get_key_rec(record)
             if not key_rec: # some fields missing, filter out rec
@@ -92,12 +104,38 @@ class MapByPipe(Pipe, KeyedSource):
                 else:
                     self.rec_map[key] = record
 
+        # combine with the clones, the last one to finish holds the merged map
+        parts = self.partials.submit((self.rec_map, self.counts))
+        if parts is None:
+            self.rec_map = {}
+            return
+
+        self.rec_map, self.counts = parts[0]
+        for rec_map, counts in parts[1:]:
+            self.merge(rec_map, counts)
+
         if self.do_count:
             for k, v in self.rec_map.items():
                 if self.do_count:
                     c = self.counts.get(k, 0)
                     v['count'] = c
 
+    def merge(self, rec_map: dict, counts: dict):
+        for key, rec in rec_map.items():
+            existing = self.rec_map.get(key)
+            if existing is None:
+                self.rec_map[key] = rec
+                continue
+
+            self.distinct_keys.increment(-1) # both clones counted it
+            if self.is_group:
+                existing['child'].extend(rec['child'])
+            else:
+                self.rec_map[key] = rec
+
+        for key, c in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + c
+
     def __iter__(self):
         if not self.is_loaded:
             self.load()
@@ -109,16 +147,15 @@ class MapByPipe(Pipe, KeyedSource):
             self.load()
 
         key = tuple(left_rec.get(f) for f in self.fields)
-        rec = self.rec_map.pop(key, None)
-        if rec is not None:
-            self.matched_map[key] = rec
-            return rec
-        return self.matched_map.get(key)
+        rec = self.rec_map.get(key) # read-only, the map may be shared by clones
+        if rec is not None and self.track_matched:
+            self.matched.add(key)
+        return rec
 
     def get_unlookedup_records(self):
         if not self.is_loaded:
             self.load()
-        return list(self.rec_map.values())
+        return [rec for key, rec in self.rec_map.items() if key not in self.matched]
 
 class GroupByPipe(MapByPipe):
     @classmethod
@@ -135,6 +172,6 @@ class GroupByPipe(MapByPipe):
 
         return u
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
         self.is_group = True
\ No newline at end of file
@@ -34,3 +34,15 @@ class MoveField(Pipe):
             if self.src in record:
                 record[self.dst] = record.pop(self.src)
             yield record
+
+    def fuse(self, fb):
+        return [f'if {self.src!r} in record:',
+                f'    record[{self.dst!r}] = record.pop({self.src!r})']
+
+    def iter_batches(self):
+        src, dst = self.src, self.dst
+        for batch in self.left.iter_batches():
+            for record in batch:
+                if src in record:
+                    record[dst] = record.pop(src)
+            yield batch
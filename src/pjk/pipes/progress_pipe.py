@@ -25,6 +25,20 @@ class ProgressPipe(Pipe, ProgressIgnore): # ignores only the component register
             self.counter.increment()
             yield record
 
+    def iter_batches(self):
+        for batch in self.left.iter_batches():
+            self.counter.increment(len(batch))
+            yield batch
+
+    def read_tail(self, limit: int):
+        records = self.left.read_tail(limit)
+        if records is not None:
+            self.counter.increment(len(records))
+        return records
+
+    def push_limit(self, limit: int):
+        self.left.push_limit(limit) # counting passes every record through
+
     def deep_copy(self):
         source_clone = self.left.deep_copy()
         if not source_clone:
@@ -4,6 +4,8 @@ from typing import Any, Dict, Iterable, Optional
 from abc import abstractmethod
 from pjk.progress import papi
 
+FETCH_SIZE = 1000 # rows per fetchmany() from a database cursor
+
 class QueryPipe(Pipe):
     name: str = None
     desc: str = None
@@ -40,9 +42,27 @@ class QueryPipe(Pipe):
         self.output_shape = usage.get_param('shape')
         self.count = usage.get_param('count')
         self.query_field = 'query' # for all subclasses
+        self.row_limit = None # max result rows per query, pushed down by a head
         self.inrecs = papi.get_counter(self, var_label='recs_in') 
         self.outrecs = papi.get_percentage_counter(self, var_label='recs_out', denom_counter=self.inrecs)
 
+    def push_limit(self, limit: int):
+        # Sxo nests every row in one summary record, capping rows would change it
+        if self.output_shape != 'Sxo':
+            self.row_limit = limit
+
+    def fetch_rows(self, cursor):
+        """Rows of an executed DB-API cursor, a batch at a time and no more than row_limit."""
+        remaining = self.row_limit
+        while remaining is None or remaining > 0:
+            rows = cursor.fetchmany(FETCH_SIZE if remaining is None else min(FETCH_SIZE, remaining))
+            if not rows:
+                return
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            yield from rows
+
     @abstractmethod
     def execute_query_returning_S_xO_iterable(self, record) -> Iterable[Dict[str, Any]]:
         pass
@@ -57,52 +77,55 @@ class QueryPipe(Pipe):
         for in_rec in self.left:
             self.inrecs.increment()
             iter = self.execute_query_returning_S_xO_iterable(in_rec)
-
-            if self.output_shape == 'S_xO':
-                s_done = False
-                for out_rec in iter:
-                    if not s_done:
-                        s_done = True
-                        self.outrecs.increment()
-                        yield self._make_summary_obj(in_rec, out_rec)
-                        continue
-
-                    self.outrecs.increment()
-                    yield out_rec
-
-            elif self.output_shape == 'xO':
-                s_done = False
-                for out_rec in iter:
-                    if not s_done:
-                        s_done = True
-                        continue
-                    self.outrecs.increment()
-                    yield out_rec
-
-            elif self.output_shape == 'xSO':
-                s_done = False
-                for out_rec in iter:
-                    if not s_done:
-                        s_done = True
-                        summary = self._make_summary_obj(in_rec, out_rec)
-                        continue
+            try:
+                yield from self._shape_output(in_rec, iter)
+            finally:
+                if hasattr(iter, 'close'):
+                    iter.close() # a head stopping early closes the query's cursor now
+
+    def _shape_output(self, in_rec: dict, iter):
+        if self.output_shape == 'S_xO':
+            s_done = False
+            for out_rec in iter:
+                if not s_done:
+                    s_done = True
                     self.outrecs.increment()
-                    yield summary | out_rec
-
-            elif self.output_shape == 'Sxo':
-                s_done = False
-                summary = {}
-                r_list = []
-
-                for out_rec in iter:
-                    if not s_done:
-                        s_done = True
-                        summary = self._make_summary_obj(in_rec, out_rec)
-                        continue
-                    r_list.append(out_rec)
-                summary['child'] = r_list
-                self.outrecs.increment()
-                yield summary
-
+                    yield self._make_summary_obj(in_rec, out_rec)
+                    continue
 
-            
+                self.outrecs.increment()
+                yield out_rec
+
+        elif self.output_shape == 'xO':
+            s_done = False
+            for out_rec in iter:
+                if not s_done:
+                    s_done = True
+                    continue
+                self.outrecs.increment()
+                yield out_rec
+
+        elif self.output_shape == 'xSO':
+            s_done = False
+            for out_rec in iter:
+                if not s_done:
+                    s_done = True
+                    summary = self._make_summary_obj(in_rec, out_rec)
+                    continue
+                self.outrecs.increment()
+                yield summary | out_rec
+
+        elif self.output_shape == 'Sxo':
+            s_done = False
+            summary = {}
+            r_list = []
+
+            for out_rec in iter:
+                if not s_done:
+                    s_done = True
+                    summary = self._make_summary_obj(in_rec, out_rec)
+                    continue
+                r_list.append(out_rec)
+            summary['child'] = r_list
+            self.outrecs.increment()
+            yield summary
@@ -18,20 +18,25 @@ class RemoveField(DeepCopyPipe):
         usage.def_example(expr_tokens=["{id:1, dir:'up', color:'blue'}", 'drop:id,color'], expect="dir: 'up'")
         return usage
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
         arg_string = usage.get_arg('fields')
         self.fields = [f.strip() for f in arg_string.split(',') if f.strip()]
         if not self.fields:
             raise UsageError("rm must include at least one valid field name")
-        self.count = 0
-
-    def reset(self):
-        self.count = 0
 
     def __iter__(self):
         for record in self.left:
-            self.count += 1
             for field in self.fields:
                 record.pop(field, None)
             yield record
+
+    def fuse(self, fb):
+        return [f'record.pop({field!r}, None)' for field in self.fields]
+
+    def iter_batches(self):
+        for batch in self.left.iter_batches():
+            for record in batch:
+                for field in self.fields:
+                    record.pop(field, None)
+            yield batch
@@ -3,14 +3,41 @@
 
 from __future__ import annotations
 
+import itertools
 import random
-from typing import Iterable, List, Optional
+from typing import Iterable, List
 
-from pjk.components import Pipe
-from pjk.usage import ParsedToken, Usage
+from pjk.components import DeepCopyPipe, get_partials
+from pjk.usage import ParsedToken, Usage, UsageError
 from pjk.progress import papi
+from pjk.sketches import hash64
+from pjk.work_units import worker_no
 
-class SamplePipe(Pipe):
+def merge_reservoirs(parts: List[tuple], nsamples: int, rng: random.Random) -> List[dict]:
+    """
+    Uniform sample of nsamples records from the union of the streams behind
+    parts, each (reservoir, seen).  How many come from each reservoir is drawn
+    as if picking records one by one from the whole union without replacement.
+    """
+    remaining = [seen for _, seen in parts]
+    takes = [0] * len(parts)
+    total = sum(remaining)
+    for _ in range(min(nsamples, total)):
+        pick = rng.randrange(total)
+        for i, rem in enumerate(remaining):
+            if pick < rem:
+                break
+            pick -= rem
+        takes[i] += 1
+        remaining[i] -= 1
+        total -= 1
+
+    out = []
+    for (reservoir, _), take in zip(parts, takes):
+        out.extend(rng.sample(reservoir, take))
+    return out
+
+class SamplePipe(DeepCopyPipe):
     """
     Reservoir-style sampler:
       if recno < nsamples: A[recno] = rec
@@ -18,52 +45,102 @@ class SamplePipe(Pipe):
         i = p * recno   (p ~ Uniform[0,1))
         if i < nsamples: A[i] = rec
 
-    Exhausts all input, then yields the sampled records.
+    Exhausts all input, then yields the sampled records.  Clones keep their
+    own reservoir and seen count, the last to finish merges them.
+    In rate mode each record is kept with probability p as it streams by.
     """
 
     @classmethod
     def usage(cls) -> Usage:
         u = Usage(
             name="sample",
-            desc="Randomly sample a fixed number of records from the input.",
+            desc="Randomly sample a fixed number of records from the input, or a fraction of them in rate mode.\n" +
+            "With a seed, the same input gives the same sample (when not fanned out).",
             component_class=cls,
         )
-        # Single positional arg: count
-        u.def_arg("count", "Number of records to sample (integer ≥ 0)", is_num=True)
+        # Single positional arg: count, or rate in rate mode
+        u.def_arg("count", "Number of records to sample (integer ≥ 0), or probability of keeping each (0..1) in rate mode")
+        u.def_param("mode", "count keeps a fixed size sample, rate a streaming fraction",
+                    valid_values={'count', 'rate'}, default='count')
+        u.def_param("seed", "seed for the random generator", is_num=True, default=None)
+        u.def_example(expr_tokens=["[{id:1}, {id:2}, {id:3}, {id:4}, {id:5}]", "sample:2@seed=7"],
+                      expect="[{id:4}, {id:2}]")
+        u.def_example(expr_tokens=["[{id:1}, {id:2}, {id:3}, {id:4}, {id:5}]", "sample:0.5@mode=rate@seed=3"],
+                      expect="[{id:1}, {id:3}]")
         return u
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
-        self.nsamples: int = int(usage.get_arg("count"))
-        if self.nsamples < 0:
-            raise Exception("sample: count must be ≥ 0")
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
+        self.is_rate = usage.get_param("mode") == 'rate'
+        try:
+            value = float(usage.get_arg("count")) if self.is_rate else int(usage.get_arg("count"))
+        except ValueError:
+            raise UsageError("sample: count must be a number")
+        if self.is_rate:
+            if not 0 <= value <= 1:
+                raise UsageError("sample: rate must be between 0 and 1")
+            self.rate = value
+        else:
+            if value < 0:
+                raise UsageError("sample: count must be ≥ 0")
+            self.nsamples: int = value
+            self.partials = get_partials(self)
+
+        # clone 0 uses the seed itself, so a single instance reproduces random.Random(seed),
+        # other clones and --procs workers (each a clone 0 of its own parse) derive their own
+        if root is None:
+            self.clone_numbers = itertools.count()
+        self.clone_no = next((root or self).clone_numbers)
+        self.seed = usage.get_param("seed")
+        self.rng = self._new_rng(self.clone_no)
 
-        # Preallocate reservoir
-        self._A: List[Optional[dict]] = [None] * self.nsamples if self.nsamples > 0 else []
+        self._A: List[dict] = []
         self._seen: int = 0  # recno (1-based in algo below)
         self.out_recs = papi.get_counter(self, var_label='out_recs')
 
+    def _new_rng(self, stream) -> random.Random:
+        if self.seed is None:
+            return random.Random()
+        worker = worker_no()
+        if stream == 0 and worker < 0:
+            return random.Random(self.seed)
+        return random.Random(hash64((self.seed, worker, stream)))
+
+    def proc_splittable(self) -> bool:
+        return self.is_rate # a count's reservoirs are merged through partials
+
     def reset(self):
-        # New instance per run; nothing to reset between drains.
-        pass
+        self._A = []
+        self._seen = 0
 
     def __iter__(self) -> Iterable[dict]:
+        if self.is_rate:
+            rate = self.rate
+            rng = self.rng
+            for rec in self.left:
+                if rng.random() < rate:
+                    self.out_recs.increment()
+                    yield rec
+            return
+
         # Fill/replace in the reservoir according to the provided algorithm
         for rec in self.left:
             self._seen += 1
             if self.nsamples == 0:
                 continue  # nothing to store
             if self._seen <= self.nsamples:
-                # A[recno] = rec   (using 0-based index: recno-1)
-                self._A[self._seen - 1] = rec
+                self._A.append(rec)
             else:
                 # i = p * recno, p ~ U[0,1)
-                i = int(random.random() * self._seen)  # 0 .. recno-1
+                i = int(self.rng.random() * self._seen)  # 0 .. recno-1
                 if i < self.nsamples:
                     self._A[i] = rec
 
-        # Emit the sampled records (compact out any None if input < nsamples)
-        for rec in self._A:
-            if rec is not None:
-                self.out_recs.increment()
-                yield rec
+        parts = self.partials.submit((self._A, self._seen))
+        if parts is None:
+            return # another clone merges and emits
+        sampled = parts[0][0] if len(parts) == 1 else merge_reservoirs(parts, self.nsamples, self._new_rng('merge'))
+
+        for rec in sampled:
+            self.out_recs.increment()
+            yield rec
@@ -18,8 +18,8 @@ class SelectFields(DeepCopyPipe):
         usage.def_example(expr_tokens=["{id:1, dir:'up', color:'blue'}", 'select:id,color'], expect="id: 1, color:'blue'")
         return usage
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
 
         arg_string = usage.get_arg('fields')
         if not arg_string:
@@ -39,3 +39,11 @@ class SelectFields(DeepCopyPipe):
                 if k not in self.keep_fields:
                     record.pop(k)
             yield record
+
+    def fuse(self, fb):
+        return [f'record = {{k: v for k, v in record.items() if k in {fb.bind(self.keep_fields)}}}']
+
+    def iter_batches(self):
+        keep = self.keep_fields
+        for batch in self.left.iter_batches():
+            yield [{k: v for k, v in record.items() if k in keep} for record in batch]
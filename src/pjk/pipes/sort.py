@@ -3,64 +3,263 @@
 
 # djk/pipes/sort.py
 
-from pjk.components import Pipe
+import heapq
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from itertools import islice
+from pjk.components import DeepCopyPipe, get_partials
+from pjk.common import get_path
 from pjk.usage import ParsedToken, Usage, UsageError
 from pjk.progress import papi
 
-class SortPipe(Pipe):
+SPILL_CHUNK = 1000 # records per pickle in a run file
+SIZE_SAMPLE = 64   # records per size estimate, each sample stands for the records after it
+MERGE_FANIN = 64   # runs open at once in a merge, more take intermediate merge passes
+
+def write_run(path: str, records, mode: str = 'wb'):
+    records = iter(records)
+    with open(path, mode) as f:
+        while True:
+            chunk = list(islice(records, SPILL_CHUNK))
+            if not chunk:
+                return
+            pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def read_run(path: str):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+def approx_size(value) -> int:
+    """Rough bytes held by a record, getsizeof of it and everything it contains."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += sys.getsizeof(k) + approx_size(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            size += approx_size(v)
+    return size
+
+MISSING = (1,) # key part of a missing field, after every (0, value)
+NUMPY_MIN = 10000 # fewer records than this aren't worth numpy's setup
+
+class _Descending:
+    """Reverses comparison of a non-numeric key part."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+def _key_part(value, reverse: bool):
+    if value is None:
+        return MISSING
+    if not reverse:
+        return (0, value)
+    if isinstance(value, (int, float)):
+        return (0, -value)
+    return (0, _Descending(value))
+
+def parse_sort_keys(arg: str) -> list:
+    """'+a,-b.c' -> [(('a',), False), (('b', 'c'), True)]"""
+    keys = []
+    for field in arg.split(','):
+        if field[:1] not in ('+', '-') or len(field) < 2:
+            raise UsageError("sort:[+-]<field>,... each field must start with '+' or '-'")
+        keys.append((tuple(field[1:].split('.')), field[0] == '-'))
+    return keys
+
+def make_sort_key(keys: list):
+    """One key per record: directions are folded into the key, missing fields sort last."""
+    if len(keys) == 1:
+        (parts, reverse), = keys
+        return lambda record: _key_part(get_path(record, parts), reverse)
+    return lambda record: tuple(_key_part(get_path(record, parts), reverse) for parts, reverse in keys)
+
+EXACT_FLOAT_INT = 2**53 # larger ints may not survive conversion to float64
+
+def numpy_order(records: list, keys: list):
+    """Stable sort order of records via numpy.lexsort, None unless every key value is an int, float or missing."""
+    try:
+        import numpy as np # lazy, optional
+    except ImportError:
+        return None
+
+    arrays = []
+    for parts, reverse in reversed(keys): # lexsort's primary key is the last array
+        col = [get_path(record, parts) for record in records]
+        dtype = np.int64
+        big_int = False # beyond float64's exact range, as python would compare it
+        for value in col:
+            kind = type(value)
+            if kind is float:
+                dtype = np.float64
+            elif kind is int:
+                big_int = big_int or abs(value) > EXACT_FLOAT_INT
+            elif value is not None:
+                return None
+        if big_int and dtype is np.float64:
+            return None
+        try:
+            values = np.array([0 if value is None else value for value in col], dtype=dtype)
+        except OverflowError:
+            return None
+        if reverse: # negated ranks, negating values wraps at -2**63
+            values = -np.unique(values, return_inverse=True)[1].reshape(-1)
+        arrays.append(values)
+        arrays.append(np.fromiter((value is None for value in col), dtype=bool, count=len(col)))
+    return np.lexsort(arrays)
+
+class SortPipe(DeepCopyPipe):
     @classmethod
     def usage(cls):
         usage = Usage(
             name='sort',
-            desc="Sort records by a single field (records with missing field sort last).",
+            desc="Sort records by one or more fields (records with missing field sort last).\n" +
+            "Beyond the memory budget, sorted runs spill to temp files and are merged back,\n" +
+            f"at most {MERGE_FANIN} at a time.  Record sizes are estimated from a sample, so the\n" +
+            "budget is approximate.  Under fan-out each clone sorts and spills its share and\n" +
+            "the runs are merged at the end.",
             component_class=cls
         )
-        usage.def_arg(name='field', usage="+name or -name for ascending or decending sort by field 'name'.")
+        usage.def_arg(name='field', usage="+name or -name for ascending or decending sort by field 'name', comma separated for more keys, e.g. +a,-b.c")
+        usage.def_param(name='memory', usage='approximate MB of records held in memory, per clone under fan-out', is_num=True, default='1024')
+        usage.def_param(name='buffer', usage='max records held in memory, no limit but memory by default', is_num=True)
         usage.def_example(expr_tokens=["[{id:17}, {id:10}, {id:1}]", 'sort:+id'], expect="[{id:1}, {id:10}, {id:17}]")
         usage.def_example(expr_tokens=["[{id:1}, {color:'blue'}, {color:'green'}]", 'sort:-color'], expect="[{color:'green'}, {color:'blue'}, {id:1}]")
+        usage.def_example(expr_tokens=["[{id:3}, {x:1}, {id:1}, {id:2}, {x:2}]", 'sort:+id@buffer=2'],
+                          expect="[{id:1}, {id:2}, {id:3}, {x:1}, {x:2}]")
+        usage.def_example(expr_tokens=["[{a:1, b:{c:'x'}}, {a:2, b:{c:'y'}}, {a:1, b:{c:'z'}}, {a:1}]", 'sort:+a,-b.c'],
+                          expect="[{a:1, b:{c:'z'}}, {a:1, b:{c:'x'}}, {a:1}, {a:2, b:{c:'y'}}]")
         return usage
 
-    def __init__(self, ptok: ParsedToken, usage: Usage):
-        super().__init__(ptok, usage)
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
 
-        arg_string = usage.get_arg('field')
-        if arg_string.startswith("-"):
-            self.field = arg_string[1:]
-            self.reverse = True
-        elif arg_string.startswith("+"):
-            self.field = arg_string[1:]
-            self.reverse = False
-        else:
-            raise UsageError("sort:[+-]<field> must start with '+' or '-'")
+        self.keys = parse_sort_keys(usage.get_arg('field'))
+        self.sort_key = make_sort_key(self.keys)
 
-        self._buffer = None
-        self._index = 0
+        self.memory_limit = max(1, int(usage.get_param('memory') * 1024 * 1024)) # bytes
+        buffer = usage.get_param('buffer')
+        self.buffer_limit = max(1, int(buffer)) if buffer is not None else None
+        self._tmp_dir = None   # this instance's spilled runs, until handed to the merger
+        self._merge_dirs = []  # every clone's spill dir, on the merging instance
+        self.partials = get_partials(self)
         self.progress_state = papi.get_progress_state(self, 'state', 'waiting')
 
+    def proc_splittable(self) -> bool:
+        return False # clones' runs are merged through partials
+
     def reset(self):
-        self._buffer = None
-        self._index = 0
+        self._remove_runs()
 
-    def __iter__(self):
-        if self._buffer is None:
-            self.progress_state.set('loading')
-            self._buffer = list(self.left)
+    def close(self):
+        self._remove_runs()
+
+    def _remove_runs(self):
+        for tmp_dir in [self._tmp_dir] + self._merge_dirs:
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        self._tmp_dir = None
+        self._merge_dirs = []
+
+    def _sort(self, records: list):
+        order = numpy_order(records, self.keys) if len(records) >= NUMPY_MIN else None
+        if order is None:
+            records.sort(key=self.sort_key)
+        else:
+            records[:] = [records[i] for i in order]
+
+    def _run_path(self, name: str) -> str:
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix='pjk-sort-')
+        return os.path.join(self._tmp_dir, name)
 
-            # Partition into records with and without the sort field
-            present = [r for r in self._buffer if r.get(self.field) is not None]
-            missing = [r for r in self._buffer if r.get(self.field) is None]
+    def load(self):
+        """
+        Consume the input into sorted runs, spilling each full buffer to a temp
+        file.  Returns the runs as iterables, the last one still in memory
+        unless clones would each hold theirs until the merge.
+        """
+        memory_limit = self.memory_limit
+        buffer_limit = self.buffer_limit
+        records = []
+        held = 0 # approximate bytes of records
+        record_size = 0
+        run_paths = []
 
-            self.progress_state.set('sorting')
-            present.sort(
-                key=lambda r: r.get(self.field),
-                reverse=self.reverse
-            )
+        for record in self.left:
+            if len(records) % SIZE_SAMPLE == 0:
+                record_size = approx_size(record)
+            held += record_size
+            records.append(record)
+            if held >= memory_limit or (buffer_limit is not None and len(records) >= buffer_limit):
+                self.progress_state.set('spilling')
+                self._sort(records)
+                run_paths.append(self._run_path(f'run-{len(run_paths)}'))
+                write_run(run_paths[-1], records)
+                records = []
+                held = 0
+                self.progress_state.set('loading')
 
-            self._buffer = present + missing  # always push missing to the end
+        self.progress_state.set('sorting')
+        self._sort(records)
+        if records and self.partials.joined > 1:
+            run_paths.append(self._run_path(f'run-{len(run_paths)}'))
+            write_run(run_paths[-1], records)
+            records = []
+        return [read_run(path) for path in run_paths] + ([records] if records else [])
 
+    def merge_passes(self, runs: list) -> list:
+        """Merge runs MERGE_FANIN at a time into new run files until one merge can take them all."""
+        passes = 0
+        while len(runs) > MERGE_FANIN:
+            self.progress_state.set('merging')
+            merged = []
+            for i in range(0, len(runs), MERGE_FANIN):
+                group = runs[i:i + MERGE_FANIN]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                path = self._run_path(f'merge-{passes}-{len(merged)}')
+                write_run(path, heapq.merge(*group, key=self.sort_key)) # adjacent runs, still stable
+                merged.append(read_run(path))
+            runs = merged
+            passes += 1
+        return runs
+
+    def __iter__(self):
+        self.progress_state.set('loading')
+        runs = self.load()
+
+        # clones sort their share; the last to finish merges everyone's runs
+        parts = self.partials.submit((runs, self._tmp_dir))
+        self._tmp_dir = None # owned by the merging instance now
+        if parts is None:
+            self.progress_state.set('empty')
+            return
+
+        self._merge_dirs = [tmp_dir for _, tmp_dir in parts if tmp_dir]
+        runs = self.merge_passes([run for runs, _ in parts for run in runs])
         self.progress_state.set('yielding')
-        while self._index < len(self._buffer):
-            yield self._buffer[self._index]
-            self._index += 1
-        self.progress_state.set('empty')
+        if len(runs) <= 1:
+            yield from (runs[0] if runs else [])
+        else:
+            # stable across runs, so equal keys keep their input order
+            yield from heapq.merge(*runs, key=self.sort_key)
 
+        self._remove_runs()
+        self.progress_state.set('empty')
@@ -3,6 +3,7 @@
 
 # djk/pipes/tail.py
 
+from collections import deque
 from pjk.components import Pipe
 from pjk.usage import ParsedToken, Usage
 
@@ -11,18 +12,20 @@ class TailPipe(Pipe):
     def usage(cls):
         usage = Usage(
             name='tail',
-            desc='take last records of input',
+            desc='take last records of input\n' +
+            'A local uncompressed json or csv file is read backwards from the end.',
             component_class=cls
         )
         usage.def_arg(name='limit', usage='number of records', is_num=True)
         usage.def_example(expr_tokens=['[{id:1}, {id:2}]', 'tail:1'], expect="{id:2}")
+        usage.def_example(expr_tokens=['[{id:1}, {id:2}, {id:3}, {id:4}]', 'tail:3'], expect="[{id:2}, {id:3}, {id:4}]")
         return usage
 
     def __init__(self, ptok: ParsedToken, usage: Usage):
         super().__init__(ptok, usage)
         self.limit = usage.get_arg('limit')
 
-        self.buffer = []
+        self.buffer = deque(maxlen=self.limit) # ring buffer of the last records
         self.ready = False
 
     def reset(self):
@@ -31,10 +34,8 @@ class TailPipe(Pipe):
 
     def __iter__(self):
         if not self.ready:
-            for record in self.left:
-                self.buffer.append(record)
-                if len(self.buffer) > self.limit:
-                    self.buffer.pop(0)
+            records = self.left.read_tail(self.limit)
+            self.buffer.extend(self.left if records is None else records)
             self.ready = True
 
         yield from self.buffer
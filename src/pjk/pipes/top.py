@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# djk/pipes/top.py
+
+import heapq
+from pjk.components import DeepCopyPipe, get_partials
+from pjk.usage import ParsedToken, Usage
+from pjk.pipes.sort import parse_sort_keys, make_sort_key
+
+class _Kept:
+    """Heap entry ordered so that heapq's smallest is the worst record kept."""
+    __slots__ = ('key', 'seq', 'record')
+
+    def __init__(self, key, seq: int, record: dict):
+        self.key = key
+        self.seq = seq
+        self.record = record
+
+    def __lt__(self, other):
+        return (other.key, other.seq) < (self.key, self.seq)
+
+class TopPipe(DeepCopyPipe):
+    @classmethod
+    def usage(cls):
+        usage = Usage(
+            name='top',
+            desc="Keep the first records by sort keys, same as sort then head but in memory bounded by limit.\n" +
+            "Under fan-out each clone keeps its own top records and they are merged at the end.",
+            component_class=cls
+        )
+        usage.def_arg(name='limit', usage='number of records', is_num=True)
+        usage.def_arg(name='field', usage="+name or -name as in sort, comma separated for more keys, e.g. -score,+id")
+        usage.def_example(expr_tokens=["[{id:1, s:5}, {id:2, s:9}, {id:3}, {id:4, s:7}]", 'top:2:-s'],
+                          expect="[{id:2, s:9}, {id:4, s:7}]")
+        usage.def_example(expr_tokens=["[{id:1, s:5}, {id:2}, {id:3, s:5}]", 'top:2:+s,-id'],
+                          expect="[{id:3, s:5}, {id:1, s:5}]")
+        return usage
+
+    def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
+        super().__init__(ptok, usage, root)
+        self.limit = usage.get_arg('limit')
+        self.sort_key = make_sort_key(parse_sort_keys(usage.get_arg('field')))
+        self.partials = get_partials(self)
+
+    def proc_splittable(self) -> bool:
+        return False # clones' heaps are merged through partials
+
+    def __iter__(self):
+        limit = self.limit
+        sort_key = self.sort_key
+        heap = []
+        for seq, record in enumerate(self.left):
+            key = sort_key(record)
+            if len(heap) < limit:
+                heapq.heappush(heap, _Kept(key, seq, record))
+            elif heap and key < heap[0].key: # on a tie the earlier record stays
+                heapq.heapreplace(heap, _Kept(key, seq, record))
+
+        # the last clone to finish picks the top of everyone's heaps
+        parts = self.partials.submit(heap)
+        if parts is None:
+            return
+
+        kept = [(kept.key, clone_no, kept.seq, kept.record)
+                for clone_no, part in enumerate(parts) for kept in part]
+        kept.sort(key=lambda entry: entry[:3])
+        for entry in kept[:limit]:
+            yield entry[3]
@@ -6,7 +6,7 @@
 from pjk.usage import NoBindUsage
 from pjk.components import Pipe, DeepCopyPipe
 from pjk.usage import ParsedToken, Usage, UsageError
-from pjk.common import SafeNamespace
+from pjk.common import compile_record_expr, record_globals
 from pjk.progress import papi
 
 class WherePipe(DeepCopyPipe):
@@ -20,6 +20,7 @@ class WherePipe(DeepCopyPipe):
         u.def_arg(name='expr', usage='Python expression using \'f.<field>\' syntax')
         u.def_example(expr_tokens=["[{size:1}, {size:5}, {size:10}]", "where:f.size >= 5"], expect="[{size:5}, {size:10}]")
         u.def_example(expr_tokens=["[{color:'blue'}, {color:'red'}, {color:'black'}]", "where:f.color.startswith('bl')"], expect="[{color:'blue'}, {color:'black'}]")
+        u.def_example(expr_tokens=["[{dims:{w:1}}, {dims:{w:5}}, {id:3}]", "where:f.dims.w > 2"], expect="[{dims:{w:5}}]")
         return u
 
     def __init__(self, ptok: ParsedToken, usage: Usage, root = None):
@@ -29,7 +30,8 @@ class WherePipe(DeepCopyPipe):
         self.inrecs = papi.get_counter(self, var_label='recs_in', display=False)
         self.outrecs = papi.get_percentage_counter(self, var_label='recs_out', denom_counter=self.inrecs)
         try:
-            self.code = compile(self.expr, '<where>', 'eval')
+            self.code = compile_record_expr(self.expr, '<where>')
+            self.env = record_globals()
         except Exception as e:
             raise UsageError(f"Invalid where expression: {self.expr}") from e
 
@@ -39,12 +41,34 @@ class WherePipe(DeepCopyPipe):
     def __iter__(self):
         for record in self.left:
             self.inrecs.increment()
-            f = SafeNamespace(record)
             try:
-                if eval(self.code, {}, {'f': f}):
+                if eval(self.code, self.env, {'f': record}):
                     self.outrecs.increment()
                     yield record
             except Exception:
                 continue  # ignore eval errors
 
+    def fuse(self, fb):
+        return [fb.count(self.inrecs),
+                'try:',
+                f'    if not eval({fb.bind(self.code)}, {fb.bind(self.env)}, {{"f": record}}):',
+                '        continue',
+                'except Exception:',
+                '    continue  # ignore eval errors',
+                fb.count(self.outrecs)]
+
+    def iter_batches(self):
+        for batch in self.left.iter_batches():
+            self.inrecs.increment(len(batch))
+            out = []
+            for record in batch:
+                try:
+                    if eval(self.code, self.env, {'f': record}):
+                        out.append(record)
+                except Exception:
+                    continue  # ignore eval errors
+            if out:
+                self.outrecs.increment(len(out))
+                yield out
+
     
\ No newline at end of file
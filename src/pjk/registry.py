@@ -59,6 +59,7 @@ class ComponentRegistry:
     def print_usage(self):
         with pager_stdout():
             print('Usage: pjk <source> [<pipe> ...] <sink>')
+            print('       pjk --procs=N <source> [<pipe> ...] <sink>  (split files over N processes, stateless pipes only)')
             print('       pjk man <component> | --all')
             print('       pjk examples | configs | macros | + (for history)')
             print()
@@ -21,7 +21,7 @@ class DevNullSink(Sink):
         super().__init__(ptok, usage)
 
     def process(self):
-        for record in self.input:
+        for batch in self.input.iter_batches():
             pass
 
     def deep_copy(self):
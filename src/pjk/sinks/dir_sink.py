@@ -7,6 +7,7 @@ from pjk.usage import ParsedToken, Usage
 from typing import Optional, Type
 from .format_sink import Sink
 from pjk.log import logger
+from pjk.work_units import worker_no
 import gzip
 
 class DirSink(Sink):
@@ -18,7 +19,9 @@ class DirSink(Sink):
         self.fileno = fileno
         self.num_files = 1
 
-        if fileno == 0: # only root does it
+        if fileno == 0 and worker_no() >= 0: # --procs worker, parent already prepared
+            self.fileno = worker_no()
+        elif fileno == 0: # only root does it
             self._prepare()
 
     def _prepare(self):
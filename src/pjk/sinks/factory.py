@@ -14,6 +14,7 @@ from pjk.sinks.tsv_sink import TSVSink
 from pjk.sinks.expect import ExpectSink
 from pjk.sinks.format_sink import FormatSink
 from pjk.sinks.create_sink import CreateSink
+from pjk.sinks.index_sink import IndexSink
 from pjk.integrations.opensearch_index_sink import OpenSearchIndexSink
 from pjk.sinks.user_sink_factory import UserSinkFactory
 
@@ -25,7 +26,8 @@ COMPONENTS = {
         'csv': CSVSink,
         'tsv': TSVSink,
         'os_index': OpenSearchIndexSink,
-        'create': CreateSink
+        'create': CreateSink,
+        'index': IndexSink,
         }
 
 class SinkFactory(ComponentFactory):
@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# djk/sinks/index_sink.py
+
+import os
+import json
+import sqlite3
+from pjk.components import Sink
+from pjk.usage import ParsedToken, Usage, TokenError
+from pjk.progress import papi
+from pjk.sources.index_source import SCHEMA, encode_key
+
+class IndexSink(Sink):
+    @classmethod
+    def usage(cls):
+        usage = Usage(
+            name='index',
+            desc="Writes records to an on-disk index file by key, read back with the index source\n" +
+            "as a Keyed Source for join or filter. Takes the last instance of duplicates like mapby.\n" +
+            "Filters out records without all key fields. The file is replaced once complete.",
+            component_class=cls
+        )
+        usage.def_arg(name='key', usage='comma separated fields to index by')
+        usage.def_param(name='path', usage='index file to write')
+        usage.def_example(expr_tokens=["dims.json", "index:id@path=dims.idx"], expect=None)
+        return usage
+
+    def __init__(self, ptok: ParsedToken, usage: Usage):
+        super().__init__(ptok, usage)
+        self.fields = usage.get_arg('key').split(',')
+        self.path = usage.get_param('path')
+        if not self.path:
+            raise TokenError("index requires a file, e.g. index:id@path=dims.idx")
+        self.missing_keys = papi.get_counter(self, 'missing_keys')
+
+    def process(self):
+        tmp_path = f'{self.path}.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF") # a failed build is just removed
+            conn.execute("PRAGMA synchronous = OFF")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.execute("INSERT INTO meta VALUES ('fields', ?)", (json.dumps(self.fields),))
+
+            fields = self.fields
+            for batch in self.input.iter_batches():
+                rows = []
+                for record in batch:
+                    key = encode_key(record, fields)
+                    if key is None:
+                        self.missing_keys.increment()
+                        continue
+                    rows.append((key, json.dumps(record)))
+                conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?)", rows)
+            conn.commit()
+        except BaseException:
+            conn.close()
+            os.remove(tmp_path)
+            raise
+        conn.close()
+        os.replace(tmp_path, self.path) # readers never see a partial index
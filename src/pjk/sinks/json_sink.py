@@ -9,6 +9,6 @@ class JsonSink(FormatSink):
     extension = 'json'
 
     def process(self) -> None:
-        for record in self.input:
-            self.outfile.write(json.dumps(record) + "\n")
+        for batch in self.input.iter_batches():
+            self.outfile.write("".join(json.dumps(record) + "\n" for record in batch))
         # Caller (DirSink/S3Sink) owns closing the outfile
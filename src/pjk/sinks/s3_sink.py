@@ -7,6 +7,7 @@ from typing import Optional, Type
 from pjk.components import Source, Sink
 from pjk.log import logger
 from pjk.sinks.s3_stream import S3MultipartWriter
+from pjk.work_units import worker_no
 
 
 class S3Sink(Sink):
@@ -30,7 +31,7 @@ class S3Sink(Sink):
         self.path_no_ext = path_no_ext if not path_no_ext.startswith('//') else path_no_ext[2:] # strip leading //
         self.sink_class = sink_class
         self.is_gz = is_gz
-        self.fileno = fileno
+        self.fileno = fileno if fileno != 0 or worker_no() < 0 else worker_no()
         self.is_single_file = fileno == -1
         if self.path_no_ext.endswith('/') and not self.is_single_file:
             self.path_no_ext = self.path_no_ext[:-1]
@@ -0,0 +1,291 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# pjk/sketches.py
+#
+# Bounded-memory summaries used by named aggregations.  Every sketch can
+# merge() another of the same kind, so partial results from deep-copied
+# pipes combine into one.  Key sets (HashSet64, BloomFilter) hold hash64()
+# values for distinct and keyset.
+
+import hashlib
+import math
+from array import array
+from typing import List
+
+class TDigest:
+    """Merging t-digest (Dunning) for approximate quantiles.
+
+    Values are buffered and periodically compressed into at most ~compression
+    centroids, sized by the k1 scale function so the tails stay accurate.
+    """
+    BUFFER_FACTOR = 5
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.buffer: List[float] = []
+        self.total = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self):
+        return self.total
+
+    def add(self, value):
+        self.buffer.append(value)
+        self.total += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self.buffer) >= self.BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        other._compress()
+        self._compress(zip(other.means, other.weights))
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def _compress(self, extra=()):
+        points = list(zip(self.means, self.weights))
+        points.extend((v, 1) for v in self.buffer)
+        points.extend(extra)
+        self.buffer = []
+        if not points:
+            return
+        points.sort(key=lambda p: p[0])
+
+        total = sum(w for _, w in points)
+        means, weights = [], []
+        cur_mean, cur_w = points[0]
+        w_before = 0
+        q_limit = self._q(self._k(0) + 1)
+
+        for mean, w in points[1:]:
+            if (w_before + cur_w + w) / total <= q_limit:
+                cur_w += w
+                cur_mean += (mean - cur_mean) * w / cur_w
+            else:
+                means.append(cur_mean)
+                weights.append(cur_w)
+                w_before += cur_w
+                q_limit = self._q(self._k(w_before / total) + 1)
+                cur_mean, cur_w = mean, w
+
+        means.append(cur_mean)
+        weights.append(cur_w)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float):
+        self._compress()
+        if not self.means:
+            return 0
+
+        target = q * self.total
+        # centroid i covers the weight around its center; interpolate between centers
+        prev_center, prev_mean = 0, self.min
+        cum = 0
+        for mean, w in zip(self.means, self.weights):
+            center = cum + w / 2
+            if target == center:
+                return mean
+            if target < center:
+                if center == prev_center:
+                    return mean
+                return prev_mean + (mean - prev_mean) * (target - prev_center) / (center - prev_center)
+            prev_center, prev_mean = center, mean
+            cum += w
+
+        if target >= cum or cum == prev_center:
+            return self.max
+        return prev_mean + (self.max - prev_mean) * (target - prev_center) / (cum - prev_center)
+
+def key_value(value):
+    """value as a key, numbers equal in python (1, 1.0, True) become the same int as in a dict."""
+    if isinstance(value, bool) or (isinstance(value, float) and value.is_integer()):
+        return int(value)
+    return value
+
+def hash64(value) -> int:
+    """Stable 64-bit hash; unlike hash() it agrees across processes.  Values, or the
+    items of a tuple, that are equal dict keys hash the same (see key_value)."""
+    value = tuple(map(key_value, value)) if isinstance(value, tuple) else key_value(value)
+    data = repr(value).encode() # repr keeps 1 and '1' apart
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+class HyperLogLog:
+    """Distinct-count estimate in 2**precision one-byte registers.
+
+    Small cardinalities are kept exactly as a set of hashes and only switch to
+    registers once that set would outgrow them.
+    """
+    MIN_PRECISION = 4
+    MAX_PRECISION = 18
+
+    def __init__(self, precision: int = 14):
+        if not self.MIN_PRECISION <= precision <= self.MAX_PRECISION:
+            raise ValueError(f'precision must be {self.MIN_PRECISION}..{self.MAX_PRECISION}')
+        self.precision = precision
+        self.m = 1 << precision
+        self.sparse = set()
+        self.registers = None
+
+    def add(self, value):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, h: int):
+        if self.registers is None:
+            self.sparse.add(h)
+            if len(self.sparse) > self.m // 16:
+                self._densify()
+            return
+
+        p = self.precision
+        idx = h >> (64 - p)
+        w = (h << p) & 0xFFFFFFFFFFFFFFFF
+        rank = 65 - w.bit_length() if w else 65 - p
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def _densify(self):
+        self.registers = bytearray(self.m)
+        hashes, self.sparse = self.sparse, set()
+        for h in hashes:
+            self.add_hash(h)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError('cannot merge HyperLogLogs of different precision')
+        if other.registers is None:
+            for h in other.sparse:
+                self.add_hash(h)
+            return self
+        if self.registers is None:
+            self._densify()
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        if self.registers is None:
+            return len(self.sparse)
+
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros) # linear counting for the low range
+        return int(round(estimate))
+
+class HashSet64:
+    """Set of 64-bit hashes in an open-addressing array, 16 to 32 bytes a key.
+
+    Membership is by hash alone, so two keys colliding in 64 bits (about one
+    chance in 10**19 per pair) count as the same key.
+    """
+    EMPTY = 0
+
+    def __init__(self, capacity: int = 1024):
+        size = 16
+        while size < 2 * capacity:
+            size <<= 1
+        self.table = array('Q', bytes(8 * size))
+        self.mask = size - 1
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, h: int) -> bool:
+        """Add h, returns False if it was already there."""
+        h = h or 1 # 0 marks an empty slot
+        table, mask = self.table, self.mask
+        i = h & mask
+        while True:
+            slot = table[i]
+            if slot == h:
+                return False
+            if slot == self.EMPTY:
+                break
+            i = (i + 1) & mask
+
+        table[i] = h
+        self.count += 1
+        if 2 * self.count > mask:
+            self._grow()
+        return True
+
+    def __contains__(self, h: int) -> bool:
+        h = h or 1
+        table, mask = self.table, self.mask
+        i = h & mask
+        while True:
+            slot = table[i]
+            if slot == h:
+                return True
+            if slot == self.EMPTY:
+                return False
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old = self.table
+        self.table = array('Q', bytes(16 * len(old)))
+        self.mask = len(self.table) - 1
+        self.count = 0
+        for h in old:
+            if h != self.EMPTY:
+                self.add(h)
+
+class BloomFilter:
+    """Approximate set of 64-bit hashes in a fixed bit array.
+
+    Sized for capacity keys at false positive rate fp_rate, the rate climbs
+    once more keys than that are added.  Never a false negative.
+    """
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        if not 0 < fp_rate < 1:
+            raise ValueError('fp_rate must be between 0 and 1')
+        self.num_bits = max(64, int(math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0 # adds that set a new bit, an estimate of distinct keys
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, h: int):
+        # Kirsch-Mitzenmacher: k positions from two halves of one 64-bit hash
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, h: int) -> bool:
+        """Add h, returns False if it was (probably) already there."""
+        bits = self.bits
+        added = False
+        for pos in self._positions(h):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, h: int) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h))
@@ -23,3 +23,14 @@ class CSVSource(FormatSource):
             reader = csv.DictReader(f, delimiter=self.delimiter)
             for row in reader:
                 yield row
+
+    def read_tail(self, limit: int):
+        lines = self.lazy_file.last_lines(limit + 1) # one more, the header if the file is that short
+        if lines is None or len(lines) <= limit or any('"' in line for line in lines):
+            return None # small file or quoting (maybe newlines in fields), read it all
+
+        with self.lazy_file.open() as f:
+            header = next(csv.reader(f, delimiter=self.delimiter), None)
+        if header is None:
+            return None
+        return list(csv.DictReader(lines[1:], fieldnames=header, delimiter=self.delimiter))
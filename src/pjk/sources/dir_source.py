@@ -8,6 +8,7 @@ from typing import Optional
 from pjk.components import Source
 from pjk.sources.lazy_file_local import LazyFileLocal
 from pjk.log import logger
+from pjk.work_units import share_units
 
 
 class DirSource(Source):
@@ -21,11 +22,13 @@ class DirSource(Source):
     def __init__(self, root: Source, file_iter = None, source_classes: dict = None, format_override: str = None):
         super().__init__(root=root) 
         self.current = None
+        self.limit = None # pushed down by a head, handed to each file's source
         if not root: # WE! are the root
             if not file_iter:
                 raise Exception('root creation must include file_iter')
             self.file_iter = file_iter
             self.iterator_lock = threading.Lock()
+            self.cancelled = threading.Event()
             self.format_override = format_override
             self.source_classes = source_classes
 
@@ -34,6 +37,7 @@ class DirSource(Source):
             self.source_classes = root.source_classes
             self.format_override = root.format_override
             self.iterator_lock = root.iterator_lock
+            self.cancelled = root.cancelled
 
     # ---------------------------------------------------------------------
     # Iteration
@@ -71,6 +75,8 @@ class DirSource(Source):
         Thread-safe advancement of the shared file iterator.
         Returns the next file path, or None when exhausted.
         """
+        if self.cancelled.is_set():
+            return None
         with self.iterator_lock:
             if self.file_iter is None:
                 return None
@@ -83,6 +89,15 @@ class DirSource(Source):
                 logger.debug('get_next_file -> None (exhausted)')
                 return None
 
+    def push_limit(self, limit: int):
+        self.limit = limit
+        if self.current is not None:
+            self.current.push_limit(limit)
+
+    def cancel(self):
+        # shared by every clone, so none of them reserves another file
+        self.cancelled.set()
+
     def _get_next_source(self) -> Optional[Source]:
         """
         Keep drawing files until we either exhaust or we can construct a Source.
@@ -123,7 +138,10 @@ class DirSource(Source):
             return None
 
         lazy_file = LazyFileLocal(file, is_gz)
-        return source_class(lazy_file)
+        source = source_class(lazy_file)
+        if self.limit is not None:
+            source.push_limit(self.limit)
+        return source
 
     def deep_copy(self):
         clone = DirSource(self)
@@ -171,7 +189,7 @@ class DirSource(Source):
         """
         Factory: returns a DirSource that will lazily enumerate files.
         """
-        file_iter = cls._iter_files(path_no_ext, recursive)
+        file_iter = share_units(cls._iter_files(path_no_ext, recursive))
 
         return DirSource(
             root = None, # THIS is the root
@@ -14,6 +14,9 @@ from pjk.sources.user_source_factory import UserSourceFactory
 from pjk.sources.parquet_source import ParquetSource
 from pjk.sources.format_source import FormatSource
 from pjk.sources.s3_select_source import S3SelectSource
+from pjk.sources.index_source import IndexSource
+from pjk.integrations.postgres_lookup import PostgresLookup
+from pjk.integrations.opensearch_lookup import OpenSearchLookup
 
 COMPONENTS = {
         'inline': InlineSource,
@@ -25,6 +28,9 @@ COMPONENTS = {
         'sql': SQLSource,
         'npy': NpySource,
         'parquet': ParquetSource,
+        'index': IndexSource,
+        'pg_lookup': PostgresLookup,
+        'os_lookup': OpenSearchLookup,
     }
 
 class SourceFactory(ComponentFactory):
@@ -0,0 +1,94 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# An index file is a sqlite database mapping keys to records, written by the
+# index sink and read here as a KeyedSource, so a large right side of a join
+# or filter is hashed once instead of through mapby on every run.
+
+import json
+import sqlite3
+import threading
+from typing import List, Optional
+from pjk.components import Source, KeyedSource
+from pjk.usage import ParsedToken, Usage, TokenError
+from pjk.progress import papi
+from pjk.sketches import key_value
+
+FETCH_SIZE = 1000 # rows per fetch when scanning the index
+
+SCHEMA = [
+    "CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE records (key TEXT PRIMARY KEY, record TEXT) WITHOUT ROWID",
+]
+
+def encode_key(record: dict, fields: List[str]) -> Optional[str]:
+    """Index key of record, None if a key field is missing."""
+    key = [key_value(record.get(field)) for field in fields]
+    return None if None in key else json.dumps(key, separators=(',', ':'))
+
+class IndexSource(Source, KeyedSource):
+    @classmethod
+    def usage(cls):
+        u = Usage(
+            name='index',
+            desc="Keyed Source over an index file written by the index sink, for join or filter.\n" +
+            "Records are looked up on disk by the key fields the index was built with.\n" +
+            "Keys match as in mapby, 1 and 1.0 are the same key but '1' is not.\n" +
+            "As a plain source it yields every indexed record.",
+            component_class=cls
+        )
+        u.def_arg(name='path', usage='index file')
+        u.def_example(expr_tokens=["events.json", "index:dims.idx", "join:left", "-"], expect=None)
+        return u
+
+    def __init__(self, ptok: ParsedToken, usage: Usage):
+        super().__init__(root=None)
+        self.path = usage.get_arg('path')
+        try:
+            self.conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+            meta = dict(self.conn.execute("SELECT name, value FROM meta"))
+        except sqlite3.Error as e:
+            raise TokenError(f"'{self.path}' is not an index file: {e}")
+        self.fields = json.loads(meta['fields'])
+        self.lock = threading.Lock() # one connection, lookups may come from several threads
+        self.matched = set() # keys looked up, only when track_matched for outer join
+        # counted here, the parser adds no progress pipe after a keyed source
+        self.recs_out = papi.get_counter(self, 'recs_out')
+
+    def _rows(self, sql: str):
+        with self.lock:
+            cursor = self.conn.execute(sql)
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def __iter__(self):
+        for (record,) in self._rows("SELECT record FROM records"):
+            self.recs_out.increment()
+            yield json.loads(record)
+
+    def lookup(self, left_rec) -> Optional[dict]:
+        key = encode_key(left_rec, self.fields)
+        if key is None:
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT record FROM records WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.track_matched:
+                self.matched.add(key)
+        return json.loads(row[0])
+
+    def get_unlookedup_records(self):
+        # streamed, the index may be far larger than memory
+        for key, record in self._rows("SELECT key, record FROM records"):
+            if key not in self.matched:
+                yield json.loads(record)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -40,3 +40,14 @@ class JsonSource(FormatSource):
                     except:
                         logger.error(f'cannot decode {self.lazy_file.path}')
                         break
+
+    def read_tail(self, limit: int):
+        lines = self.lazy_file.last_lines(limit)
+        if lines is None:
+            return None
+        try:
+            records = [json.loads(line) for line in lines]
+        except json.JSONDecodeError:
+            return None # not json lines, e.g. a whole-file array
+        self.num_recs += len(records)
+        return records
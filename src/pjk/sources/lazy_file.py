@@ -2,7 +2,7 @@
 # Copyright 2024 Mike Schultz
 
 from abc import ABC, abstractmethod
-from typing import IO
+from typing import IO, List, Optional
 
 class LazyFile(ABC):
     @abstractmethod
@@ -14,3 +14,7 @@ class LazyFile(ABC):
     def name(self) -> str:
         """Return a descriptive identifier (e.g. path or URI)."""
         pass
+
+    def last_lines(self, n: int) -> Optional[List[str]]:
+        """The last n non-blank lines without reading the rest, or None if not supported."""
+        return None
@@ -3,9 +3,12 @@
 
 import gzip
 import io
-from typing import IO
+import os
+from typing import IO, List, Optional
 from pjk.sources.lazy_file import LazyFile
 
+TAIL_BLOCK = 1 << 16 # bytes read per step backwards from the end
+
 class LazyFileLocal(LazyFile):
     def __init__(self, path: str, is_gz: bool = False):
         self.path = path
@@ -20,3 +23,33 @@ class LazyFileLocal(LazyFile):
 
     def name(self) -> str:
         return self.path
+
+    def last_lines(self, n: int) -> Optional[List[str]]:
+        if self.path.endswith(".gz") or self.is_gz:
+            return None # can't seek backwards in a gzip stream
+        if n <= 0:
+            return []
+
+        with open(self.path, "rb") as f:
+            pos = f.seek(0, os.SEEK_END)
+            data = b""
+            lines = []
+            while pos > 0:
+                size = min(TAIL_BLOCK, pos)
+                pos -= size
+                f.seek(pos)
+                data = f.read(size) + data
+                if pos == 0 or data.count(b"\n") > n:
+                    lines = self._whole_lines(data, pos)
+                    if len(lines) >= n:
+                        break
+
+        return [line.rstrip(b"\r").decode("utf-8") for line in lines[-n:]]
+
+    @staticmethod
+    def _whole_lines(data: bytes, pos: int) -> List[bytes]:
+        """Non-blank lines of data read from pos, less the first if it may have started earlier."""
+        lines = data.split(b"\n")
+        if pos > 0:
+            lines = lines[1:]
+        return [line for line in lines if line.strip()]
@@ -6,6 +6,32 @@ import gzip
 from typing import IO
 from pjk.sources.lazy_file import LazyFile
 
+class _BodyReader(io.RawIOBase):
+    """Raw stream over a get_object Body, so text is read as it downloads."""
+    def __init__(self, body):
+        self.body = body
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf) -> int:
+        data = self.body.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.body.close() # abandons the rest of the download
+        super().close()
+
+class _GzipBody(gzip.GzipFile):
+    """GzipFile that also closes the body it decompresses."""
+    def close(self):
+        fileobj = self.fileobj
+        super().close()
+        if fileobj is not None:
+            fileobj.close()
+
 class LazyFileS3(LazyFile):
     def __init__(self, bucket: str, key: str, is_gz: bool):
         import boto3 # lazy import
@@ -16,13 +42,13 @@ class LazyFileS3(LazyFile):
 
     def open(self, binary=False) -> IO[str]:
         obj = self.s3.get_object(Bucket=self.bucket, Key=self.key)
-        raw_body = obj['Body'].read()
+        if binary and not self.is_gz:
+            return io.BytesIO(obj['Body'].read()) # readers like parquet need to seek
+
+        stream = io.BufferedReader(_BodyReader(obj['Body']))
         if self.is_gz:
-            return io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(raw_body)))
-        elif binary:
-            return io.BytesIO(raw_body)
-        else:
-            return io.StringIO(raw_body.decode("utf-8"))
+            return io.TextIOWrapper(_GzipBody(fileobj=stream), encoding='utf-8')
+        return io.TextIOWrapper(stream, encoding='utf-8')
 
     def name(self) -> str:
         return f"s3://{self.bucket}/{self.key}"
@@ -0,0 +1,132 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# A lookup source is a KeyedSource over a remote table or index.  Left records
+# are looked up a batch at a time, one request per batch of uncached keys, and
+# the results kept in a bounded LRU cache, so a join or filter against a remote
+# table costs N/batch round trips instead of one per record.
+
+import threading
+from abc import abstractmethod
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, List, Optional
+from pjk.components import Source, KeyedSource
+from pjk.usage import ParsedToken, Usage, TokenError, CONFIG_FILE
+from pjk.progress import papi
+
+_UNCACHED = object()
+
+class LRUCache:
+    """Bounded map evicting the least recently used key, thread-safe."""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self.entries.get(key, _UNCACHED)
+            if value is _UNCACHED:
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+def hashable_key(record: dict, field: str):
+    """record's key, None if missing or a list or dict that can't be looked up."""
+    key = record.get(field)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def def_lookup_params(usage: Usage):
+    """Args and params shared by lookup sources."""
+    usage.def_arg(name='instance', usage=f"instance of the database, {CONFIG_FILE} must contain an entry for it.")
+    usage.def_param(name='key', usage='field of the left records, matched against the same field remotely')
+    usage.def_param(name='batch', usage='keys per remote request', is_num=True, default='500')
+    usage.def_param(name='cache', usage='looked up keys kept in the LRU cache, misses included', is_num=True, default='100000')
+
+class LookupSource(Source, KeyedSource):
+    """
+    Subclasses implement fetch(), returning the remote records of a list of
+    distinct keys.  Shared by the clones of a join or filter, fetches are
+    serialized so a client needn't be thread-safe.
+    """
+    listable = False
+    def __init__(self, ptok: ParsedToken, usage: Usage):
+        super().__init__(root=None)
+        self.name = usage.name
+        self.field = usage.get_param('key')
+        if not self.field:
+            raise TokenError(f"{self.name} requires the field to look up, e.g. {self.name}:<instance>@key=id")
+        self.batch_size = max(1, int(usage.get_param('batch')))
+        self.cache = LRUCache(int(usage.get_param('cache')))
+        self.fetch_lock = threading.Lock()
+
+        self.keys = papi.get_counter(self, 'keys', display=False)
+        self.cache_hits = papi.get_percentage_counter(self, 'cache_hits', self.keys)
+        self.requests = papi.get_counter(self, 'requests')
+
+    @abstractmethod
+    def fetch(self, keys: List[Any]) -> Dict[Any, dict]:
+        """Remote record per key of keys that has one, in a single request."""
+        pass
+
+    def __iter__(self):
+        raise ValueError(f"{self.name} is a keyed source for join or filter, it has no records of its own")
+
+    def lookups(self, records):
+        records = iter(records)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                return
+            yield from zip(batch, self.lookup_batch(batch))
+
+    def lookup_batch(self, batch: List[dict]) -> List[Optional[dict]]:
+        field = self.field
+        matches = {}
+        missing = []
+        keys = [hashable_key(record, field) for record in batch]
+        for key in keys:
+            if key is None or key in matches:
+                continue
+            self.keys.increment()
+            match = self.cache.get(key, _UNCACHED)
+            if match is _UNCACHED:
+                missing.append(key)
+                matches[key] = None
+            else:
+                self.cache_hits.increment()
+                matches[key] = match
+
+        if missing:
+            with self.fetch_lock:
+                self.requests.increment()
+                found = self.fetch(missing)
+            for key in missing:
+                match = found.get(key)
+                self.cache.put(key, match) # a miss is cached too
+                matches[key] = match
+
+        return [matches.get(key) for key in keys]
+
+    def lookup(self, left_rec) -> Optional[dict]:
+        return self.lookup_batch([left_rec])[0]
+
+    def get_unlookedup_records(self):
+        raise ValueError(f"{self.name} can't list the remote records no left record matched")
@@ -4,16 +4,26 @@
 from pjk.sources.lazy_file import LazyFile
 from pjk.sources.format_source import FormatSource
 
+LIMITED_BATCH = 65536 # rows per batch when reading under a limit
+
 class ParquetSource(FormatSource):
     extension = 'parquet'
 
     def __init__(self, lazy_file: LazyFile):
         self.lazy_file = lazy_file
         self.num_recs = 0
+        self.limit = None
+
+    def push_limit(self, limit: int):
+        self.limit = limit
 
     def __iter__(self):
         import pyarrow.parquet as pq # lazy import
         with self.lazy_file.open(binary=True) as f:
+            if self.limit is not None:
+                yield from self._iter_limited(pq.ParquetFile(f))
+                return
+
             table = pq.read_table(f)
             batch = table.to_pydict()
 
@@ -26,3 +36,14 @@ class ParquetSource(FormatSource):
                 record = {col: batch[col][i] for col in batch}
                 self.num_recs += 1
                 yield record
+
+    def _iter_limited(self, parquet_file):
+        # decode only the row batches a head will use, not the whole table
+        remaining = self.limit
+        for batch in parquet_file.iter_batches(batch_size=max(1, min(remaining, LIMITED_BATCH))):
+            for record in batch.to_pylist()[:remaining]:
+                self.num_recs += 1
+                yield record
+            remaining -= batch.num_rows
+            if remaining <= 0:
+                return
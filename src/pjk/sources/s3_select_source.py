@@ -10,6 +10,22 @@ import yaml
 
 from pjk.components import Source
 from pjk.usage import ParsedToken, Usage
+from pjk.work_units import share_units
+
+
+LIMIT_PATTERN = re.compile(r"\bLIMIT\s+(\d+)\s*;?\s*$", re.IGNORECASE)
+
+def limit_query(query: str, limit: int) -> str:
+    """
+    Cap the rows an S3 Select query returns per object.  An existing trailing
+    LIMIT is lowered, a query with LIMIT anywhere else is left alone.
+    """
+    m = LIMIT_PATTERN.search(query)
+    if m:
+        return f"{query[:m.start()]}LIMIT {min(int(m.group(1)), limit)}"
+    if re.search(r"\bLIMIT\b", query, re.IGNORECASE):
+        return query # not a clause we can safely rewrite
+    return f"{query.rstrip().rstrip(';').rstrip()} LIMIT {limit}"
 
 
 # ============================================================
@@ -38,6 +54,9 @@ class S3SelectObjectSource(Source):
         self._input_format = input_format
         self._is_gz = is_gz
 
+    def push_limit(self, limit: int):
+        self._query = limit_query(self._query, limit)
+
     def _build_input_serialization(self) -> Dict[str, Any]:
         fmt = self._input_format.lower()
 
@@ -73,28 +92,32 @@ class S3SelectObjectSource(Source):
         decoder = json.JSONDecoder()
         buffer = ""
 
-        for event in resp["Payload"]:
-            if "Records" not in event:
-                continue
+        try:
+            for event in resp["Payload"]:
+                if "Records" not in event:
+                    continue
 
-            chunk = event["Records"]["Payload"].decode("utf-8")
-            buffer += chunk
+                chunk = event["Records"]["Payload"].decode("utf-8")
+                buffer += chunk
 
-            # peel off as many complete JSON objects as we can
-            while True:
-                stripped = buffer.lstrip()
-                if not stripped:
-                    buffer = ""
-                    break
+                # peel off as many complete JSON objects as we can
+                while True:
+                    stripped = buffer.lstrip()
+                    if not stripped:
+                        buffer = ""
+                        break
 
-                try:
-                    obj, end = decoder.raw_decode(stripped)
-                except json.JSONDecodeError:
-                    # incomplete JSON; wait for more data
-                    break
+                    try:
+                        obj, end = decoder.raw_decode(stripped)
+                    except json.JSONDecodeError:
+                        # incomplete JSON; wait for more data
+                        break
 
-                yield obj
-                buffer = stripped[end:]
+                    yield obj
+                    buffer = stripped[end:]
+        finally:
+            # stopped early (e.g. by head), drop the rest of the response stream
+            resp["Payload"].close()
 
 
 # ============================================================
@@ -135,6 +158,7 @@ class _SharedS3SelectState:
         self._exhausted = False
         self._prefix_index = 0
         self._current_iter: Optional[Iterator[str]] = None
+        self._key_iter = share_units(self._iter_all_keys())
 
     @staticmethod
     def _get_format_gz(value: str) -> Tuple[str, bool]:
@@ -201,6 +225,15 @@ class _SharedS3SelectState:
             is_gz=is_gz,
         )
 
+    def push_limit(self, limit: int):
+        """Sources built from now on query at most limit rows per object."""
+        self.query = limit_query(self.query, limit)
+
+    def cancel(self):
+        """No more keys are reserved, by any source sharing this state."""
+        with self._lock:
+            self._exhausted = True
+
     def reserve_next_source(self) -> Optional[Source]:
         """
         Atomically reserve and construct the next per-key S3SelectObjectSource.
@@ -214,7 +247,7 @@ class _SharedS3SelectState:
                 return None
 
             try:
-                key = next(self._iter_all_keys())
+                key = next(self._key_iter)
             except StopIteration:
                 self._exhausted = True
                 return None
@@ -339,6 +372,14 @@ class S3SelectSource(Source):
 
             self._current = None
 
+    def push_limit(self, limit: int):
+        self._state.push_limit(limit)
+        if self._current is not None:
+            self._current.push_limit(limit)
+
+    def cancel(self):
+        self._state.cancel()
+
     def deep_copy(self):
         reserved = self._state.reserve_next_source()
         if reserved is None:
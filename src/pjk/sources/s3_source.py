@@ -6,6 +6,7 @@ from typing import Optional, Any, Iterator, Tuple
 from pjk.components import Source
 from pjk.sources.lazy_file_s3 import LazyFileS3
 from pjk.log import logger
+from pjk.work_units import share_units
 
 class _SharedS3State:
     """
@@ -23,9 +24,10 @@ class _SharedS3State:
         self.format_override = format_override
 
         # Build a *single* lazy iterator over keys from the paginator.
-        self._key_iter = self._iter_s3_keys()
+        self._key_iter = share_units(self._iter_s3_keys())
         self._lock = Lock()
         self._exhausted = False  # explicit flag; avoids extra paginator calls after completion
+        self.limit = None # pushed down by a head, handed to each key's source
 
     def _iter_s3_keys(self) -> Iterator[str]:
         paginator = self.s3.get_paginator("list_objects_v2")
@@ -64,7 +66,15 @@ class _SharedS3State:
 
         source_class = self.sources.get(format)
         lazy_file = LazyFileS3(self.bucket, key, is_gz)
-        return source_class(lazy_file)
+        source = source_class(lazy_file)
+        if self.limit is not None:
+            source.push_limit(self.limit)
+        return source
+
+    def cancel(self):
+        """No more keys are reserved, by any source sharing this state."""
+        with self._lock:
+            self._exhausted = True
 
     def reserve_next_source(self) -> Optional[Source]:
         """
@@ -114,6 +124,14 @@ class S3Source(Source):
             # Move to next file
             self._current = None
 
+    def push_limit(self, limit: int):
+        self._state.limit = limit
+        if self._current is not None:
+            self._current.push_limit(limit)
+
+    def cancel(self):
+        self._state.cancel()
+
     def deep_copy(self):
         """
         Proactively reserve one unit of work for the clone so that multiple workers
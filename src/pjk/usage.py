@@ -323,6 +323,8 @@ class UsageError(ValueError):
         self.token_error = token_error
 
     def __str__(self):
+        if self.tokens is None: # raised at run time, not while parsing
+            return self.message
         lines = []
         token_copies = [self._quote(t) for t in self.tokens]
         lines.append('pjk ' + ' '.join(token_copies))
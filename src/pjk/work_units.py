@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 Mike Schultz
+
+# pjk/work_units.py
+#
+# Process-level counterpart of DirSource.get_next_file and
+# _SharedS3State.reserve_next_source.
+#
+# Sources that split their work by file hand their lazy iterator of work units
+# (file paths, s3 keys) to share_units() when they are created.  Normally it is
+# returned untouched.  Under --procs the parent parses the expression in
+# 'parent' mode and feeds each registered iterator into a queue; every worker
+# process re-parses the same tokens in 'worker' mode and the same sources, in
+# the same parse order, draw their units from those queues instead.
+
+from typing import Any, Iterator, List, Optional
+
+class _TakenIter:
+    """Remembers units pulled in the parent so the feeder can still hand them out."""
+    def __init__(self, unit_iter: Iterator[Any]):
+        self.unit_iter = unit_iter
+        self.taken: List[Any] = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        unit = next(self.unit_iter)
+        self.taken.append(unit)
+        return unit
+
+    def drain(self) -> Iterator[Any]:
+        yield from self.taken
+        yield from self.unit_iter
+
+class WorkUnits:
+    def __init__(self, queues: Optional[list] = None, worker_no: int = -1):
+        self.queues = queues          # one queue per shared source, worker side only
+        self.worker_no = worker_no    # -1 in the parent
+        self.shared: List[_TakenIter] = []  # parent side only
+        self.num_shared = 0
+
+    def is_worker(self) -> bool:
+        return self.worker_no >= 0
+
+    def share(self, unit_iter: Iterator[Any]) -> Iterator[Any]:
+        ix = self.num_shared
+        self.num_shared += 1
+
+        if not self.is_worker():
+            taken = _TakenIter(unit_iter)
+            self.shared.append(taken)
+            return taken
+
+        if ix >= len(self.queues):
+            raise Exception('worker parsed more splittable sources than the parent')
+        return iter(self.queues[ix].get, None) # None is the end-of-units sentinel
+
+# set per process by main.execute_procs / main.proc_worker
+units: Optional[WorkUnits] = None
+
+def share_units(unit_iter: Iterator[Any]) -> Iterator[Any]:
+    if units is None:
+        return unit_iter
+    return units.share(unit_iter)
+
+def worker_no() -> int:
+    """Index of this worker process, or -1 when not running under --procs."""
+    return units.worker_no if units else -1
@@ -0,0 +1,22 @@
+import json
+from pjk.main import execute_tokens
+from pjk.components import BATCH_SIZE
+
+# spans several batches so batch boundaries get exercised
+NUM_RECS = 2 * BATCH_SIZE + 17
+
+def test_batch_pipes_to_json_sink(tmp_path):
+    with open(f"{tmp_path}/in.json", "w") as f:
+        for i in range(NUM_RECS):
+            f.write(json.dumps({"id": i, "junk": "x", "kids": [{"k": 1}, {"k": 2}]}) + "\n")
+
+    # json sink pulls iter_batches() through every pipe
+    execute_tokens([f"{tmp_path}/in.json", "where:f.id % 3 == 0", "let:half=f.id // 2", "as:id:num",
+                    "drop:junk", "explode:kids", "select:num,half,k", f"{tmp_path}/out.json"])
+
+    expected = [{"num": i, "half": i // 2, "k": k} for i in range(NUM_RECS) if i % 3 == 0 for k in (1, 2)]
+    execute_tokens([f"{tmp_path}/out.json", f"expect:{json.dumps(expected)}"])
+
+    # the per-record path still agrees
+    execute_tokens([f"{tmp_path}/in.json", "where:f.id % 3 == 0", "let:half=f.id // 2", "as:id:num",
+                    "drop:junk", "explode:kids", "select:num,half,k", f"expect:{json.dumps(expected)}"])
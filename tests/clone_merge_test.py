@@ -0,0 +1,127 @@
+import json
+import random
+from pjk.main import execute_tokens, execute_threaded
+from pjk.parser import ExpressionParser
+from pjk.registry import ComponentRegistry
+from pjk.pipes.sample import merge_reservoirs
+
+def run_cloned(tokens: list, num_sinks: int = 4):
+    """Fan out to num_sinks threads the way main does when there are cpus to spare."""
+    sink = ExpressionParser(ComponentRegistry()).parse(tokens)
+    sinks = [sink]
+    while len(sinks) < num_sinks:
+        clone = sink.deep_copy()
+        assert clone, 'expression should fan out'
+        sinks.append(clone)
+    execute_threaded(sinks)
+    return sink
+
+def test_agg_merges_clone_tables(pjk_dir):
+    pjk_dir.write_input(num_files=6, recs_per_file=9)
+    run_cloned([str(pjk_dir.input), "agg:host@sum=n,max=file,p100=n,distinct=file", f"json:{pjk_dir.out}"])
+
+    expected = [{"host": f"h{h}", "count": 18, "sum_n": 6 * (h + h + 3 + h + 6),
+                 "max_file": 5, "p100_n": h + 6, "distinct_file": 6} for h in range(3)]
+    execute_tokens([str(pjk_dir.out), f"expect:{json.dumps(expected)}"])
+
+def test_groupby_mapby_merge_clone_maps(pjk_dir):
+    pjk_dir.write_input(num_files=6, recs_per_file=9)
+    run_cloned([str(pjk_dir.input), "groupby:host@count=true", "let:ns=sorted(x.file * 10 + x.n for x in f.child)",
+                "drop:child", f"json:{pjk_dir.out}"])
+    expected = [{"host": f"h{h}", "count": 18, "ns": sorted(i * 10 + j for i in range(6) for j in (h, h + 3, h + 6))}
+                for h in range(3)]
+    execute_tokens([str(pjk_dir.out), f"expect:{json.dumps(expected)}"])
+
+    run_cloned([str(pjk_dir.input), "mapby:host@count=true", "select:host,count", f"json:{pjk_dir.out}"])
+    expected = [{"host": f"h{h}", "count": 18} for h in range(3)]
+    execute_tokens([str(pjk_dir.out), f"expect:{json.dumps(expected)}"])
+
+def test_top_level_reduce_merges_clone_accumulators(pjk_dir):
+    pjk_dir.write_input(num_files=6, recs_per_file=9)
+    run_cloned([str(pjk_dir.input), "reduce:total+=f.n", "reduce:prod*=2 if f.n == 0 else 1", "reduce:neg-=f.file",
+                "reduce:ave=ave:f.file", "reduce:hi=max:f.file", "reduce:p=p50:f.n", "reduce:files=distinct:f.file",
+                "reduce:hosts={x:1 for x in f.host}", "reduce:ns=[x for x in f.n]", f"json:{pjk_dir.out}"])
+    expected = {"total": 6 * 36, "prod": 64, "neg": -9 * 15, "ave": 2.5, "hi": 5, "p": 4, "files": 6,
+                "hosts": {"h0": 1, "h1": 1, "h2": 1}}
+    execute_tokens([str(pjk_dir.out), "let:n=len(f.ns)", "drop:ns", f"expect:{json.dumps(dict(expected, n=54))}"])
+
+def test_reduce_using_acc_does_not_fan_out(pjk_dir):
+    pjk_dir.write_input(num_files=2, recs_per_file=2)
+    for expr in ("x-=acc * 0 + f.n", "x+=acc * 0 + f.n", "x+=[acc for _ in f.n]"):
+        sink = ExpressionParser(ComponentRegistry()).parse([str(pjk_dir.input), f"reduce:{expr}", f"json:{pjk_dir.out}"])
+        assert sink.deep_copy() is None, expr
+
+def test_sort_merges_clone_runs(pjk_dir):
+    pjk_dir.write_input(num_files=6, recs_per_file=20)
+    with open(pjk_dir.input / "file-6.json", "w") as f:
+        f.write('{"file": 6}\n') # no n, sorts last
+    for buffer in (1000, 7): # in-memory runs, then spilled runs
+        run_cloned([str(pjk_dir.input), f"sort:-n@buffer={buffer}", f"json:{pjk_dir.out}"])
+        ns = [rec.get("n") for rec in pjk_dir.read_out()]
+        assert ns == sorted([j for j in range(20) for _ in range(6)], reverse=True) + [None]
+
+def test_sort_clones_spill_their_last_run(pjk_dir, monkeypatch):
+    import pjk.pipes.sort as sort
+    pjk_dir.write_input(num_files=6, recs_per_file=20)
+    written = []
+    write_run = sort.write_run
+    monkeypatch.setattr(sort, "write_run", lambda path, recs, mode='wb': (written.append(path), write_run(path, recs, mode)))
+    run_cloned([str(pjk_dir.input), "sort:+n", f"json:{pjk_dir.out}"])
+    # each clone with records spills its one run instead of holding it until the merge
+    assert len(written) > 1 and all(path.endswith("run-0") for path in written)
+    assert [rec["n"] for rec in pjk_dir.read_out()] == sorted(j for j in range(20) for _ in range(6))
+
+def test_top_merges_clone_heaps(pjk_dir):
+    pjk_dir.write_input(num_files=6, recs_per_file=20)
+    run_cloned([str(pjk_dir.input), "top:5:-n,+file", f"json:{pjk_dir.out}"])
+    expected = [{"file": i, "n": 19, "host": "h1"} for i in range(5)]
+    execute_tokens([str(pjk_dir.out), f"expect:{json.dumps(expected)}"])
+
+def test_head_budget_spans_clones(pjk_dir):
+    pjk_dir.write_input(num_files=40, recs_per_file=50)
+    sink = run_cloned([str(pjk_dir.input), "head:7", f"json:{pjk_dir.out}"])
+    assert len(pjk_dir.read_out()) == 7
+
+    # clones cancelled the directory listing instead of reading every file
+    source = sink.input
+    while not hasattr(source, 'cancelled'):
+        source = source.left
+    assert source.cancelled.is_set()
+    assert source.file_iter is not None
+
+def test_sample_merges_clone_reservoirs(pjk_dir):
+    parts = [(["a0", "a1"], 2), (["b0", "b1", "b2"], 3)]
+    rng = random.Random(5)
+    counts = {}
+    for _ in range(5000):
+        picked = merge_reservoirs(parts, 4, rng)
+        assert len(set(picked)) == 4
+        for rec in picked:
+            counts[rec] = counts.get(rec, 0) + 1
+    # every record of the union is kept with probability 4/5
+    assert all(abs(c / 5000 - 0.8) < 0.03 for c in counts.values())
+
+    pjk_dir.write_input(num_files=6, recs_per_file=20)
+    run_cloned([str(pjk_dir.input), "sample:5@seed=1", "let:key=f.file * 100 + f.n", f"json:{pjk_dir.out}"])
+    assert len({rec["key"] for rec in pjk_dir.read_out()}) == 5
+
+def test_distinct_clones_share_keys(pjk_dir):
+    pjk_dir.write_input(num_files=6, recs_per_file=9)
+    run_cloned([str(pjk_dir.input), "distinct:host", "select:host", f"json:{pjk_dir.out}"])
+    assert sorted(rec["host"] for rec in pjk_dir.read_out()) == ["h0", "h1", "h2"]
+
+def test_join_and_filter_clones_share_right_side(pjk_dir):
+    pjk_dir.write_input(num_files=6, recs_per_file=9)
+    with open(pjk_dir.path / "hosts.json", "w") as f:
+        for host in ("h0", "h1", "h9"):
+            f.write(json.dumps({"host": host, "name": host.upper()}) + "\n")
+
+    run_cloned([str(pjk_dir.input), str(pjk_dir.path / "hosts.json"), "mapby:host", "join:outer", "select:host,name,n", f"json:{pjk_dir.out}"])
+    expected = [{"host": f"h{h}", "name": f"H{h}", "n": n} for h in (0, 1) for n in (h, h + 3, h + 6) for _ in range(6)]
+    expected += [{"host": "h2", "n": n} for n in (2, 5, 8) for _ in range(6)]
+    expected += [{"host": "h9", "name": "H9"}] # unmatched right, added once
+    execute_tokens([str(pjk_dir.out), f"expect:{json.dumps(expected)}"])
+
+    run_cloned([str(pjk_dir.input), str(pjk_dir.path / "hosts.json"), "mapby:host", "filter:-", "select:host,n", f"json:{pjk_dir.out}"])
+    expected = [{"host": "h2", "n": n} for n in (2, 5, 8) for _ in range(6)]
+    execute_tokens([str(pjk_dir.out), f"expect:{json.dumps(expected)}"])
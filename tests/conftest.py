@@ -1,3 +1,4 @@
+import json
 import pytest
 
 @pytest.fixture(autouse=True)
@@ -7,3 +8,30 @@ def _disable_pjk_history(monkeypatch, tmp_path):
 
     # Option 2 (alternative): redirect to a temp file so nothing hits your real home
     # monkeypatch.setenv("PJK_HISTORY_FILE", str(tmp_path / ".pjk-history"))
+
+class PjkDir:
+    """A test's tmp_path, with an input dir of json files and an out dir for sinks to write."""
+    def __init__(self, path):
+        self.path = path
+        self.input = path / "in"
+        self.out = path / "out"
+
+    def write_input(self, num_files: int, recs_per_file: int):
+        """num_files json files of {file, n, host} records, n counting up in each."""
+        self.input.mkdir(exist_ok=True)
+        for i in range(num_files):
+            with open(self.input / f"file-{i}.json", "w") as f:
+                for j in range(recs_per_file):
+                    f.write(json.dumps({"file": i, "n": j, "host": f"h{j % 3}"}) + "\n")
+
+    def read_out(self) -> list:
+        """Records of every file in out, in file name order."""
+        records = []
+        for path in sorted(self.out.iterdir()):
+            with open(path) as f:
+                records.extend(json.loads(line) for line in f)
+        return records
+
+@pytest.fixture
+def pjk_dir(tmp_path):
+    return PjkDir(tmp_path)
@@ -0,0 +1,19 @@
+from pjk.main import execute_tokens
+from pjk.parser import ExpressionParser
+from pjk.registry import ComponentRegistry
+from pjk.pipes.fuse import FusedPipe
+
+TOKENS = ["[{id:1, x:'a'}, {id:2, x:'b'}, {id:3, x:'c'}]",
+          "let:big=f.id * 10", "where:f.big > 10", "select:id,big,x", "as:x:name", "drop:id"]
+
+def test_fused_chain_results():
+    execute_tokens(TOKENS + ["expect:[{big:20, name:'b'}, {big:30, name:'c'}]"])
+
+def test_stateless_run_is_fused():
+    sink = ExpressionParser(ComponentRegistry()).parse(TOKENS + ["devnull"])
+    fused = sink.input.left
+    assert isinstance(fused, FusedPipe)
+    assert [p.usage.name for p in fused.pipes] == ['let', 'where', 'select', 'as', 'drop']
+
+    batches = list(fused.iter_batches())
+    assert batches == [[{'big': 20, 'name': 'b'}, {'big': 30, 'name': 'c'}]]
@@ -0,0 +1,39 @@
+import os
+import json
+from pjk.main import execute_tokens
+from pjk.registry import ComponentRegistry
+
+def test_index_is_a_keyed_source(tmp_path):
+    dims = [{"id": i, "k": i % 2, "name": f"d{i}"} for i in range(50)] + [{"id": 3, "k": 1, "name": "last"}, {"name": "nokey"}]
+    with open(f"{tmp_path}/dims.json", "w") as f:
+        f.writelines(json.dumps(r) + "\n" for r in dims)
+    left = json.dumps([{"id": i, "k": i % 2, "x": i} for i in range(45, 55)] + [{"id": 3, "k": 1}])
+
+    execute_tokens([f"{tmp_path}/dims.json", f"index:id,k@path={tmp_path}/dims.idx"])
+    assert not os.path.exists(f"{tmp_path}/dims.idx.tmp")
+
+    for mode in ("left", "inner", "outer"):
+        execute_tokens([left, f"{tmp_path}/dims.json", "mapby:id,k", f"join:{mode}", f"{tmp_path}/expected.json"])
+        with open(f"{tmp_path}/expected.json") as f:
+            expected = json.dumps([json.loads(line) for line in f])
+        execute_tokens([left, f"index:{tmp_path}/dims.idx", f"join:{mode}", f"expect:{expected}"])
+
+    execute_tokens([left, f"index:{tmp_path}/dims.idx", "filter:-", "select:id", "expect:[{id:50}, {id:51}, {id:52}, {id:53}, {id:54}]"])
+    execute_tokens([f"index:{tmp_path}/dims.idx", "where:f.id == 3", "expect:{id:3, k:1, name:'last'}"])
+    execute_tokens(["[{id:3.0, k:true}, {id:'3', k:1}]", f"index:{tmp_path}/dims.idx", "join:inner", "select:name", "expect:{name:'last'}"])
+
+    source = ComponentRegistry().create_source(f"index:{tmp_path}/dims.idx")
+    assert len(list(source)) == 50 and source.recs_out.read() == 50 # counted without a progress pipe
+    source.close()
+
+def test_index_records_matches_only_for_outer_join(tmp_path, monkeypatch):
+    from pjk.sources.index_source import IndexSource
+    execute_tokens(["[{id:1}, {id:2}, {id:3}]", f"index:id@path={tmp_path}/ids.idx"])
+    closed = []
+    close = IndexSource.close
+    monkeypatch.setattr(IndexSource, "close", lambda self: (closed.append(self), close(self)))
+    for keyed in ("join:left", "join:inner", "filter:+"):
+        execute_tokens(["[{id:1}, {id:2}]", f"index:{tmp_path}/ids.idx", keyed, "-"])
+        assert not closed.pop().matched
+    execute_tokens(["[{id:1}, {id:2}]", f"index:{tmp_path}/ids.idx", "join:outer", "expect:[{id:1}, {id:2}, {id:3}]"])
+    assert len(closed.pop().matched) == 2
@@ -1,8 +1,78 @@
+import os
+import glob
+import json
+import random
+import tempfile
+import pytest
+from pjk.parser import ExpressionParser
+from pjk.registry import ComponentRegistry
 from pjk.main import execute_tokens
+from pjk.usage import UsageError
 
 def test_concat():
     execute_tokens([
                 "[{up:1}, {up:2}, {up:3}]", # source 1
                 "[{down:4}, {down:5}, {down:6}]",
                 "join:concat",
-                "-"])
\ No newline at end of file
+                "-"])
+def test_keyset_filter_matches_mapby_filter():
+    left = json.dumps([{"id": i, "n": i % 7} for i in range(300)])
+    right = json.dumps([{"id": i * 3} for i in range(80)] + [{"other": 1}])
+    kept = json.dumps([{"id": i, "n": i % 7} for i in range(300) if i % 3 == 0 and i < 240])
+    dropped = json.dumps([{"id": i, "n": i % 7} for i in range(300) if i % 3 != 0 or i >= 240])
+    for keyed in ("mapby:id", "keyset:id", "keyset:id@mode=bloom@capacity=100000@fp=0.0001"):
+        execute_tokens([left, right, keyed, "filter:+", f"expect:{kept}"])
+        execute_tokens([left, right, keyed, "filter:-", f"expect:{dropped}"])
+
+def test_outer_join_against_keyset_is_refused():
+    with pytest.raises(UsageError):
+        ExpressionParser(ComponentRegistry()).parse(["[{id:1}, {id:2}]", "[{id:2}, {id:3}]", "keyset:id", "join:outer", "-"]).drain()
+
+def test_merge_join_matches_hash_join():
+    rng = random.Random(3)
+    left = sorted(({"id": rng.randrange(40), "a": i} for i in range(120)), key=lambda r: r["id"])
+    right = sorted(({"id": rng.randrange(40), "b": i} for i in range(60)), key=lambda r: r["id"])
+    left.insert(10, {"a": -1}) # no key: unmatched on the left, dropped on the right
+    right.append({"b": -1})
+    left, right = json.dumps(left), json.dumps(right)
+
+    for mode in ("left", "inner", "outer"):
+        with tempfile.TemporaryDirectory() as tmp:
+            execute_tokens([left, right, "mapby:id", f"join:{mode}", "sort:+id,+a,+b", f"{tmp}/hash.json"])
+            execute_tokens([left, right, f"join:{mode}@algo=merge@key=id", "sort:+id,+a,+b", f"{tmp}/merge.json"])
+            with open(f"{tmp}/hash.json") as h, open(f"{tmp}/merge.json") as m:
+                assert h.read() == m.read()
+
+def test_merge_join_rejects_unsorted_input():
+    with pytest.raises(ValueError):
+        list(ExpressionParser(ComponentRegistry()).parse(
+            ["[{id:1}, {id:3}]", "[{id:2}, {id:1}]", "join:inner@algo=merge@key=id", "-"]).input)
+
+def test_grace_join_matches_hash_join():
+    rng = random.Random(4)
+    left = [{"id": rng.randrange(3000), "a": i} for i in range(5000)] + [{"a": -1}]
+    right = [{"id": rng.randrange(3000), "b": i} for i in range(2500)] + [{"b": -1}]
+    left, right = json.dumps(left), json.dumps(right)
+
+    for mode in ("left", "inner", "outer"):
+        with tempfile.TemporaryDirectory() as tmp:
+            execute_tokens([left, right, "mapby:id", f"join:{mode}", "sort:+id,+a,+b", f"{tmp}/hash.json"])
+            for buffer in (1000000, 100): # in memory, then spilled to partitions
+                execute_tokens([left, right, f"join:{mode}@algo=grace@key=id@buffer={buffer}", "sort:+id,+a,+b",
+                                f"{tmp}/grace.json"])
+                with open(f"{tmp}/hash.json") as h, open(f"{tmp}/grace.json") as g:
+                    assert h.read() == g.read()
+    assert not glob.glob(os.path.join(tempfile.gettempdir(), "pjk-join-*"))
+
+def test_grace_join_partitions_oversized_partitions_again(monkeypatch):
+    import pjk.pipes.join as join
+    seeds = []
+    partitions = join._Partitions
+    monkeypatch.setattr(join, "_Partitions", lambda *args, **kw: (seeds.append(kw.get("seed")), partitions(*args, **kw))[1])
+    left = json.dumps([{"id": i % 2000, "a": i} for i in range(3000)])
+    right = json.dumps([{"id": i, "b": i} for i in range(2000)])
+    expected = json.dumps([{"id": i % 2000, "a": i, "b": i % 2000} for i in range(3000)])
+    # 2000 keys over 64 partitions is ~30 a partition, each over the buffer of 10
+    execute_tokens([left, right, "join:inner@algo=grace@key=id@buffer=10", "sort:+a", f"expect:{expected}"])
+    assert seeds[:2] == [0, 0] and seeds.count(1) > 2 and 2 not in seeds
+    assert not glob.glob(os.path.join(tempfile.gettempdir(), "pjk-join-*"))
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+from pjk.parser import ExpressionParser
+from pjk.registry import ComponentRegistry
+from pjk.pipes.query_pipe import QueryPipe, FETCH_SIZE
+from pjk.sources.s3_select_source import limit_query
+
+def test_head_pushes_limit_into_dir_files(pjk_dir):
+    pjk_dir.write_input(num_files=3, recs_per_file=1)
+
+    sink = ExpressionParser(ComponentRegistry()).parse([str(pjk_dir.input), "head:2", "-"])
+    source = sink.input
+    while not hasattr(source, 'cancelled'):
+        source = source.left
+    assert source.limit == 2
+    assert source._get_next_source() is not None
+
+    # a pipe between them may drop records, so nothing is pushed through it
+    sink = ExpressionParser(ComponentRegistry()).parse([str(pjk_dir.input), "where:f.file > 0", "head:2", "-"])
+    source = sink.input
+    while not hasattr(source, 'cancelled'):
+        source = source.left
+    assert source.limit is None
+
+def test_limit_query():
+    assert limit_query("SELECT * FROM S3Object s", 10) == "SELECT * FROM S3Object s LIMIT 10"
+    assert limit_query("SELECT * FROM S3Object s;\n", 10) == "SELECT * FROM S3Object s LIMIT 10"
+    assert limit_query("SELECT * FROM S3Object s limit 50", 10) == "SELECT * FROM S3Object s LIMIT 10"
+    assert limit_query("SELECT * FROM S3Object s LIMIT 3", 10) == "SELECT * FROM S3Object s LIMIT 3"
+    query = "SELECT * FROM S3Object s WHERE s.note = 'LIMIT 5' AND s.a = 1"
+    assert limit_query(query, 10) == query
+
+class ListCursor:
+    def __init__(self, num_rows: int):
+        self.rows = [(i,) for i in range(num_rows)]
+        self.fetch_sizes = []
+
+    def fetchmany(self, size: int):
+        self.fetch_sizes.append(size)
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+def test_fetch_rows_stops_at_limit():
+    cursor = ListCursor(FETCH_SIZE * 2 + 5)
+    rows = list(QueryPipe.fetch_rows(SimpleNamespace(row_limit=None), cursor))
+    assert len(rows) == FETCH_SIZE * 2 + 5
+
+    cursor = ListCursor(FETCH_SIZE * 2 + 5)
+    rows = list(QueryPipe.fetch_rows(SimpleNamespace(row_limit=7), cursor))
+    assert rows == [(i,) for i in range(7)]
+    assert cursor.fetch_sizes == [7]
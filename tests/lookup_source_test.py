@@ -0,0 +1,68 @@
+import json
+import pytest
+from pjk.main import execute_threaded
+from pjk.parser import ExpressionParser
+from pjk.registry import ComponentRegistry
+from pjk.common import ComponentOrigin
+from pjk.usage import Usage, UsageError, TokenError
+from pjk.sources.lookup_source import LookupSource, LRUCache, def_lookup_params
+
+REMOTE = {i: {"id": i, "name": f"n{i}"} for i in range(0, 100, 2)}
+
+class DictLookup(LookupSource):
+    """Lookup source over REMOTE, recording the keys of each request."""
+    requests = []
+
+    @classmethod
+    def usage(cls):
+        u = Usage(name='dict_lookup', desc='test lookup', component_class=cls)
+        def_lookup_params(u)
+        return u
+
+    def fetch(self, keys):
+        DictLookup.requests.append(keys)
+        return {key: REMOTE[key] for key in keys if key in REMOTE}
+
+def run(tokens):
+    registry = ComponentRegistry()
+    registry.source_factory.register('dict_lookup', DictLookup, origin=ComponentOrigin.EXTERNAL)
+    sink = ExpressionParser(registry).parse(tokens)
+    execute_threaded([sink])
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', None)
+    assert cache.get('a') == 1 # a is now most recent
+    cache.put('c', 3)
+    assert cache.get('b', 'gone') == 'gone'
+    assert cache.get('a') == 1 and cache.get('c') == 3 and len(cache) == 2
+
+def test_join_looks_up_a_batch_per_request():
+    DictLookup.requests = []
+    left = [{"id": i % 30, "x": i} for i in range(100)] + [{"x": "nokey"}]
+    expected = [dict(rec, **REMOTE.get(rec.get("id"), {})) for rec in left]
+    run([json.dumps(left), "dict_lookup:test@key=id@batch=10", "join:left", f"expect:{json.dumps(expected)}"])
+
+    # 10 batches of 10, later batches only repeat keys already cached
+    assert [len(keys) for keys in DictLookup.requests] == [10, 10, 10]
+    assert sorted(k for keys in DictLookup.requests for k in keys) == list(range(30))
+
+    DictLookup.requests = []
+    run([json.dumps(left), "dict_lookup:test@key=id@batch=50@cache=0", "filter:+", "select:id",
+         f"expect:{json.dumps([{'id': i % 30} for i in range(100) if i % 2 == 0])}"])
+    assert [len(keys) for keys in DictLookup.requests] == [30, 30] # distinct keys per batch, none cached
+
+def test_outer_join_is_refused_before_any_output():
+    DictLookup.requests = []
+    with pytest.raises(UsageError):
+        run(["[{id:2}, {id:3}]", "dict_lookup:test@key=id", "join:outer", "expect:[]"])
+    assert DictLookup.requests == []
+
+def test_unhashable_and_dotted_keys():
+    left = [{"id": [2]}, {"id": {"a": 2}}, {"id": 2}]
+    expected = left[:2] + [REMOTE[2]]
+    run([json.dumps(left), "dict_lookup:test@key=id", "join:left", f"expect:{json.dumps(expected)}"])
+
+    with pytest.raises(TokenError):
+        ComponentRegistry().create_source("pg_lookup:mydb@table=s.t@key=a.b")
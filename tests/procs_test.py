@@ -0,0 +1,56 @@
+import json
+import random
+from pjk.main import execute_tokens, execute_procs
+from pjk.registry import ComponentRegistry
+from pjk.parser import ExpressionParser
+from pjk.sources.index_source import IndexSource
+
+def test_procs_dir_to_dir(pjk_dir):
+    pjk_dir.write_input(num_files=6, recs_per_file=5)
+    execute_tokens(["--procs=3", str(pjk_dir.input), "where:f.n < 2", "let:m=f.n * 10", "drop:host", f"json:{pjk_dir.out}"])
+
+    expected = [{"file": i, "n": j, "m": j * 10} for i in range(6) for j in range(2)]
+    execute_tokens([str(pjk_dir.out), f"expect:{json.dumps(expected)}"])
+
+def test_procs_not_splittable(pjk_dir):
+    # sort merges its clones' runs in memory, so this runs in-process
+    pjk_dir.write_input(num_files=2, recs_per_file=2)
+    execute_tokens(["--procs=2", str(pjk_dir.input), "sort:-n", "head:2", "select:n",
+                    "expect:[{n:1},{n:1}]"])
+
+def test_procs_not_split_when_clones_merge(pjk_dir):
+    # agg merges per-clone tables in memory, so it stays in one process
+    pjk_dir.write_input(num_files=4, recs_per_file=3)
+    execute_tokens(["--procs=2", str(pjk_dir.input), "agg:n@sum=file", "expect:[{n:0, count:4, sum_file:6}, {n:1, count:4, sum_file:6}, {n:2, count:4, sum_file:6}]"])
+
+def test_procs_declined_by_pipes_sharing_clone_state(pjk_dir):
+    pjk_dir.write_input(num_files=4, recs_per_file=3)
+    for pipe in ("sort:+n", "agg:n", "mapby:n", "groupby:n", "reduce:t+=f.n", "head:2", "top:2:+n",
+                 "sample:2", "distinct:n"):
+        assert not execute_procs([str(pjk_dir.input), pipe, f"json:{pjk_dir.out}"], ComponentRegistry(), 2), pipe
+    assert execute_procs([str(pjk_dir.input), "sample:0.5@mode=rate", f"json:{pjk_dir.out}"], ComponentRegistry(), 2)
+
+def test_procs_probe_closes_shared_right_side(pjk_dir, monkeypatch):
+    pjk_dir.write_input(num_files=2, recs_per_file=2)
+    execute_tokens([str(pjk_dir.input / "file-0.json"), f"index:n@path={pjk_dir.path}/n.idx"])
+
+    closed = []
+    close = IndexSource.close
+    monkeypatch.setattr(IndexSource, "close", lambda self: (closed.append(self), close(self)))
+    assert not execute_procs([str(pjk_dir.input), f"index:{pjk_dir.path}/n.idx", "join:inner", f"json:{pjk_dir.out}"],
+                             ComponentRegistry(), 2)
+    assert closed and closed[0].conn is None
+
+def test_seeded_sample_differs_per_worker(monkeypatch):
+    import pjk.pipes.sample as sample
+    draws = []
+    for worker in (-1, 0, 1):
+        monkeypatch.setattr(sample, "worker_no", lambda: worker)
+        sink = ExpressionParser(ComponentRegistry()).parse(["[{id:1}]", "sample:0.5@mode=rate@seed=3", "-"])
+        pipe = sink.input
+        while not isinstance(pipe, sample.SamplePipe):
+            pipe = pipe.left
+        draws.append([pipe.rng.random() for _ in range(5)])
+    rng = random.Random(3)
+    assert draws[0] == [rng.random() for _ in range(5)] # no worker, the seed itself
+    assert draws[1] != draws[2] and draws[0] not in draws[1:]
@@ -0,0 +1,22 @@
+from pjk.main import execute_tokens
+from pjk.common import compile_record_expr, record_globals
+
+def run(expr: str, record: dict):
+    return eval(compile_record_expr(expr, '<test>'), record_globals(), {'f': record})
+
+def test_field_access_matches_safe_namespace():
+    rec = {'a': {'b': {'c': 3}}, 'cars': [{'size': 2}, {'size': 5}], 'color': 'blue', 'd': {'items': 7}}
+    assert run('f.a.b.c', rec) == 3
+    assert run('f.missing', rec) is None
+    assert run('f.a.missing', rec) is None
+    assert run('f.color.startswith("bl")', rec)
+    assert run('[x.size for x in f.cars]', rec) == [2, 5]
+    assert run('f.cars[1].size', rec) == 5
+    assert run('f.d.items', rec) == 7 # keys win over dict methods, as in SafeNamespace
+
+def test_let_where_if_without_namespace():
+    execute_tokens(["[{m:{v:1}}, {m:{v:4}}, {n:1}]",
+                    "let:dbl=f.m.v * 2 if f.m else 0",
+                    "where:f.dbl != 2",
+                    "[", "let:big:yes", "if:f.m.v > 3",
+                    "expect:[{m:{v:4}, dbl:8, big:'yes'}, {n:1, dbl:0}]"])
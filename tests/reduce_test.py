@@ -0,0 +1,21 @@
+from pjk.main import execute_tokens
+from pjk.usage import ParsedToken
+from pjk.pipes.let_reduce import ReducePipe
+
+def make_reducer(token: str) -> ReducePipe:
+    return ReducePipe(ParsedToken(token), ReducePipe.usage())
+
+def test_reduce_classified_once():
+    assert make_reducer('reduce:t+=f.bytes').kind == 'plus_field'
+    assert make_reducer('reduce:t+=f.a.b').kind == 'plus'
+    assert make_reducer('reduce:t*=f.i').kind == 'fold'
+    assert make_reducer('reduce:t=[x for x in f.i]').kind == 'listcomp'
+    assert make_reducer('reduce:t={x for x in f.i}').kind == 'setcomp'
+    assert make_reducer('reduce:t={x:1 for x in f.i}').kind == 'dictcomp'
+    assert make_reducer('reduce:t=ave:f.a.b').kind == 'named'
+
+def test_reduce_resets_per_subexpression():
+    execute_tokens(["[{c:[{s:1},{s:2}]}, {c:[{s:5}]}, {c:[{s:[1]},{s:[2]}]}]",
+                    "[", "reduce:t+=f.s", "reduce:u={x for x in f.s}", "over:c",
+                    "let:u=sorted(f.u)", "drop:c",
+                    "expect:[{t:3, u:[1,2]}, {t:5, u:[5]}, {t:[1,2], u:[1,2]}]"])
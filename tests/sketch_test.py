@@ -0,0 +1,70 @@
+import random
+from pjk.sketches import TDigest, HyperLogLog, HashSet64, BloomFilter, hash64
+from pjk.main import execute_tokens
+
+def test_tdigest_quantiles_bounded_and_mergeable():
+    rng = random.Random(7)
+    values = [rng.expovariate(1 / 50) for _ in range(100_000)]
+    exact = sorted(values)
+
+    left, right, whole = TDigest(), TDigest(), TDigest()
+    for i, v in enumerate(values):
+        (left if i % 2 else right).add(v)
+        whole.add(v)
+    merged = left.merge(right)
+
+    for q in (0.5, 0.9, 0.99, 0.999):
+        truth = exact[int(q * len(exact))]
+        assert abs(whole.quantile(q) - truth) / truth < 0.02
+        assert abs(merged.quantile(q) - truth) / truth < 0.02
+
+    assert len(merged) == len(values)
+    assert len(merged.means) <= 2 * merged.compression
+    assert merged.quantile(0) == exact[0]
+    assert merged.quantile(1) == exact[-1]
+
+def test_arbitrary_percentiles():
+    execute_tokens(["[{x:1},{x:2},{x:3},{x:4},{x:5},{x:6},{x:7},{x:8},{x:9},{x:10}]",
+                    "reduce:p99=p99:f.x", "reduce:p10=p10:f.x", "reduce:s=p100:f.x@sketch=true",
+                    "expect:{p99:10, p10:1, s:10}"])
+
+def test_hyperloglog_distinct_mergeable():
+    left, right = HyperLogLog(), HyperLogLog()
+    for i in range(200_000):
+        (left if i % 2 else right).add(f'user{i % 50_000}')
+    assert abs(left.merge(right).count() - 50_000) / 50_000 < 0.03
+
+    small = HyperLogLog()
+    for v in ['a', 'b', 'a', 1, '1']:
+        small.add(v)
+    assert small.count() == 4 # exact while sparse, 1 and '1' differ
+
+def test_distinct_named_aggregation():
+    execute_tokens(["[{u:'a', c:[{v:1},{v:1}]}, {u:'b', c:[{v:2}]}, {u:'a', c:[]}]",
+                    "[", "reduce:n=distinct:f.v@precision=10", "over:c", "drop:c",
+                    "expect:[{u:'a', n:1}, {u:'b', n:1}, {u:'a'}]"])
+    execute_tokens(["[{u:'a'}, {u:'b'}, {u:'a'}, {v:1}]", "reduce:users=distinct:f.u", "expect:{users:2}"])
+
+def test_equal_numeric_keys_agree_with_mapby():
+    assert hash64(1) == hash64(1.0) == hash64(True) != hash64('1')
+    assert hash64((1, 'a')) == hash64((1.0, 'a')) and hash64(1.5) != hash64(1)
+    records = "[{id:1, n:0}, {id:1.0, n:1}, {id:true, n:2}, {id:'1', n:3}, {id:2.5, n:4}]"
+    execute_tokens([records, "mapby:id", "select:id", "expect:[{id:true}, {id:'1'}, {id:2.5}]"])
+    execute_tokens([records, "distinct:id", "select:n", "expect:[{n:0}, {n:3}, {n:4}]"])
+    execute_tokens([records, "reduce:ids=distinct:f.id", "expect:{ids:3}"])
+    execute_tokens([records, "[{id:1.0}]", "keyset:id", "filter:+", "select:n", "expect:[{n:0}, {n:1}, {n:2}]"])
+
+def test_hash_set64_grows_exactly():
+    s = HashSet64(capacity=4)
+    assert all(s.add(hash64(i)) for i in range(10000))
+    assert not any(s.add(hash64(i)) for i in range(10000))
+    assert len(s) == 10000
+    assert hash64(5) in s and hash64(10001) not in s
+    assert s.add(0) and not s.add(0) # 0 is stored apart from the empty marker
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(capacity=20000, fp_rate=0.01)
+    assert all(bloom.add(hash64(i)) or hash64(i) in bloom for i in range(20000))
+    assert all(hash64(i) in bloom for i in range(20000)) # no false negatives
+    false_positives = sum(hash64(-i - 1) in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
@@ -0,0 +1,116 @@
+import os
+import json
+import glob
+import random
+import tempfile
+from pjk.main import execute_tokens
+
+def make_records(n: int):
+    rng = random.Random(3)
+    records = []
+    for i in range(n):
+        if i % 7 == 0:
+            records.append({"i": i}) # no 'v', sorts last in input order
+        else:
+            records.append({"i": i, "v": rng.randint(0, 20)})
+    return records
+
+def expected_sort(records, reverse):
+    present = sorted((r for r in records if "v" in r), key=lambda r: r["v"], reverse=reverse)
+    return present + [r for r in records if "v" not in r]
+
+def test_external_sort_matches_in_memory(tmp_path):
+    records = make_records(200)
+    src = tmp_path / "in.json"
+    src.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    spills_before = set(glob.glob(os.path.join(tempfile.gettempdir(), "pjk-sort-*")))
+    for sign, reverse in (("+", False), ("-", True)):
+        for buffer in (7, 1000):
+            out = tmp_path / f"out{sign}{buffer}.json"
+            execute_tokens([str(src), f"sort:{sign}v@buffer={buffer}", str(out)])
+            got = [json.loads(line) for line in out.read_text().splitlines()]
+            assert got == expected_sort(records, reverse) # stable, not just same set
+
+    assert set(glob.glob(os.path.join(tempfile.gettempdir(), "pjk-sort-*"))) == spills_before
+
+def test_memory_budget_and_merge_passes(tmp_path, monkeypatch):
+    import pjk.pipes.sort as sort
+    records = make_records(200)
+    src = tmp_path / "in.json"
+    src.write_text("".join(json.dumps(r) + "\n" for r in records))
+    written = []
+    write_run = sort.write_run
+    monkeypatch.setattr(sort, "write_run", lambda path, recs, mode='wb': (written.append(os.path.basename(path)), write_run(path, recs, mode)))
+    monkeypatch.setattr(sort, "MERGE_FANIN", 3)
+
+    spills_before = set(glob.glob(os.path.join(tempfile.gettempdir(), "pjk-sort-*")))
+    for budget in ("memory=0.002", "buffer=7"): # ~2KB of records, then 7 records, per run
+        written.clear()
+        out = tmp_path / "out.json"
+        execute_tokens([str(src), f"sort:+v@{budget}", str(out)])
+        assert [json.loads(line) for line in out.read_text().splitlines()] == expected_sort(records, False)
+        runs = sum(name.startswith("run-") for name in written)
+        assert runs > 9 and any(name.startswith("merge-1-") for name in written), budget # two passes down to 3
+
+    assert set(glob.glob(os.path.join(tempfile.gettempdir(), "pjk-sort-*"))) == spills_before
+
+def reference_multi_sort(records):
+    # +a,-b.c by repeated stable sorts, least significant key first, missing last
+    out = list(records)
+    present = [r for r in out if r.get("b", {}).get("c") is not None]
+    absent = [r for r in out if r.get("b", {}).get("c") is None]
+    out = sorted(present, key=lambda r: r["b"]["c"], reverse=True) + absent
+    present = [r for r in out if "a" in r]
+    return sorted(present, key=lambda r: r["a"]) + [r for r in out if "a" not in r]
+
+def test_multi_key_sort_numpy_and_python(tmp_path, monkeypatch):
+    import pjk.pipes.sort as sort
+    rng = random.Random(11)
+    numeric, mixed = [], []
+    for i in range(300):
+        rec = {"i": i}
+        if i % 11:
+            rec["a"] = rng.randint(0, 5)
+        if i % 13:
+            rec["b"] = {"c": rng.choice([rng.random(), rng.randint(-3, 3)])}
+        numeric.append(rec)
+        mixed.append(dict(rec, b={"c": str(rec["b"]["c"])}) if "b" in rec else dict(rec))
+
+    for records in (numeric, mixed):
+        src = tmp_path / "in.json"
+        src.write_text("".join(json.dumps(r) + "\n" for r in records))
+        for numpy_min in (0, 10 ** 9):
+            monkeypatch.setattr(sort, "NUMPY_MIN", numpy_min)
+            out = tmp_path / "out.json"
+            execute_tokens([str(src), "sort:+a,-b.c@buffer=50", str(out)])
+            got = [json.loads(line)["i"] for line in out.read_text().splitlines()]
+            assert got == [r["i"] for r in reference_multi_sort(records)]
+
+def test_numpy_order_exact_at_int64_extremes():
+    from pjk.pipes.sort import numpy_order, make_sort_key
+    big = 2 ** 53
+    cases = [
+        [{"v": big + 1}, {"v": float(big)}, {"v": big}, {"v": 0.5}], # mixed, beyond float64, falls back
+        [{"v": -2 ** 63}, {"v": 2 ** 63 - 1}, {"v": 0}, {}, {"v": -2 ** 63}], # int64 range, negation would wrap
+    ]
+    for records in cases:
+        for keys in ([(("v",), False)], [(("v",), True)]):
+            order = numpy_order(records, keys)
+            expected = sorted(range(len(records)), key=lambda i: make_sort_key(keys)(records[i]))
+            assert order is None or list(order) == expected
+    assert numpy_order(cases[0], [(("v",), True)]) is None
+    assert list(numpy_order(cases[1], [(("v",), True)])) == [1, 2, 0, 4, 3]
+
+def test_top_matches_sort_head(tmp_path):
+    rng = random.Random(5)
+    records = [{"i": i, "s": rng.randint(0, 9)} if i % 5 else {"i": i} for i in range(500)]
+    src = tmp_path / "in.json"
+    src.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+    for keys in ("-s", "+s,-i", "+s"):
+        for limit in (1, 25, 450, 600):
+            top_out, sort_out = tmp_path / "top.json", tmp_path / "sort.json"
+            execute_tokens([str(src), f"top:{limit}:{keys}", str(top_out)])
+            execute_tokens([str(src), f"sort:{keys}", f"head:{limit}", str(sort_out)])
+            assert top_out.read_text() == sort_out.read_text()
@@ -0,0 +1,39 @@
+import json
+import gzip
+from pjk.main import execute_tokens
+from pjk.sources import lazy_file_local
+from pjk.sources.lazy_file_local import LazyFileLocal
+
+def test_last_lines_reads_backwards(tmp_path, monkeypatch):
+    monkeypatch.setattr(lazy_file_local, 'TAIL_BLOCK', 7) # lines straddle blocks
+    with open(f"{tmp_path}/lines.txt", "w") as f:
+        f.write("".join(f"line {i}\n" + ("\n" if i % 3 == 0 else "") for i in range(20)))
+
+    lazy = LazyFileLocal(f"{tmp_path}/lines.txt")
+    assert lazy.last_lines(4) == [f"line {i}" for i in range(16, 20)]
+    assert lazy.last_lines(0) == []
+    assert lazy.last_lines(50) == [f"line {i}" for i in range(20)]
+
+    with gzip.open(f"{tmp_path}/lines.txt.gz", "wt") as f:
+        f.write("line 0\n")
+    assert LazyFileLocal(f"{tmp_path}/lines.txt.gz").last_lines(1) is None
+
+def test_tail_of_json_and_csv_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(lazy_file_local, 'TAIL_BLOCK', 64)
+    records = [{"id": i, "name": f"n{i}"} for i in range(100)]
+    with open(f"{tmp_path}/recs.json", "w") as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+    with open(f"{tmp_path}/recs.csv", "w") as f:
+        f.write("id,name\n" + "".join(f"{r['id']},{r['name']}\n" for r in records))
+    with gzip.open(f"{tmp_path}/recs.json.gz", "wt") as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+
+    expected = json.dumps(records[-5:])
+    execute_tokens([f"{tmp_path}/recs.json", "tail:5", f"expect:{expected}"])
+    execute_tokens([f"{tmp_path}/recs.json.gz", "tail:5", f"expect:{expected}"]) # read through
+    csv_expected = json.dumps([{"id": str(r["id"]), "name": r["name"]} for r in records[-5:]])
+    execute_tokens([f"{tmp_path}/recs.csv", "tail:5", f"expect:{csv_expected}"])
+
+    # a file no longer than the tail is read through, header and all
+    csv_all = json.dumps([{"id": str(r["id"]), "name": r["name"]} for r in records])
+    execute_tokens([f"{tmp_path}/recs.csv", "tail:100", f"expect:{csv_all}"])